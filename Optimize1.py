@@ -2,10 +2,9 @@
 # -*- coding: utf-8 -*-
 
 import time
-import requests
 import threading
 from pathlib import Path
-from collections import Counter, defaultdict, deque
+from collections import Counter, defaultdict
 
 import cv2
 import numpy as np
@@ -16,72 +15,39 @@ import re  # for speed limit extraction
 # =========================
 # API Configuration
 # =========================
-BASE_URL = "http://localhost:8080"
-API_TIMEOUT = 0.5  # shorter timeout to avoid blocking
-
-
-def update_alert_via_api(alert_type, status):
-    """Update alert via Flask API (non-blocking)."""
-    try:
-        requests.post(
-            f"{BASE_URL}/update_alert",
-            json={"type": alert_type, "status": status},
-            timeout=API_TIMEOUT
-        )
-    except Exception:
-        pass  # Silent fail to avoid spam
-
-
-def update_traffic_sign_via_api(sign_type, value, distance):
-    """Update traffic sign via Flask API (non-blocking)."""
-    try:
-        requests.post(
-            f"{BASE_URL}/add_sign",
-            json={"type": sign_type, "value": value, "distance": distance},
-            timeout=API_TIMEOUT
-        )
-    except Exception:
-        pass  # Silent fail
-
-
-def update_speed_limit(new_limit):
-    """Update speed limit sign."""
-    try:
-        state = requests.get(f"{BASE_URL}/get_state", timeout=API_TIMEOUT).json()
-    except Exception:
-        print("⚠️ Could not reach state API to update speed limit")
-        return False
-
-    for sign in state.get('signs', []):
-        if sign.get('type') == 'speed_limit':
-            try:
-                requests.post(
-                    f"{BASE_URL}/update_sign",
-                    json={
-                        "id": sign['id'],
-                        "type": "speed_limit",
-                        "value": str(new_limit),
-                        "distance": "50m"
-                    },
-                    timeout=API_TIMEOUT
-                )
-                print(f"🔄 Speed limit set to {new_limit} MPH")
-                return True
-            except Exception:
-                print("⚠️ Failed to update sign through API")
-                return False
-
-    print("⚠️ Could not find speed limit sign")
-    return False
+# Shared non-blocking client: calls only queue the update, a background
+# sender batches them to the backend over one keep-alive connection
+from dashboard_client import update_alert_via_api, update_traffic_sign_via_api, update_speed_limit
+from frame_server import SharedFrameGrabber
+from mjpeg_grabber import MjpegGrabber
+from frame_stats import FrameStats
+from motion_gate import MotionGate
+from inference_engine import InferenceEngine
+from frame_preprocess import roi_preprocessors
+from detector_rois import detector_roi
+from model_backends import load_yolo, static_input
+from detection_filter import DetectionFilter
+from box_tracker import BoxTracker
+from class_metadata import ClassMetadata
+from detector_scheduler import DetectorScheduler, DetectorPolicy
 
 
 # =========================
 # Tunables
 # =========================
 STREAM_URL = "http://127.0.0.1:8090/?action=stream"
+# Name of a running frame_server.py ring (e.g. "front") to share one decoded
+# capture with other processes; None decodes STREAM_URL here
+FRAME_SERVER = None
+# "ffmpeg": cv2.VideoCapture decodes every frame; "mjpeg": parse the stream
+# here and only decode the frames the loop reads, downscaled toward IMGSZ
+GRABBER_MODE = "ffmpeg"
 IMGSZ = 384
 CONF_DEFAULT, IOU = 0.25, 0.45
 MAX_DET = 12
+# "pt" (PyTorch), "onnx" or "openvino" (export_models.py), or
+# "onnx-int8" / "openvino-int8" (quantize_models.py)
+MODEL_BACKEND = "pt"
 
 # False-positive controls
 TH_CONF = {
@@ -100,7 +66,7 @@ ASPECT_LIMITS = {
     "pedestrian": (1.3, 4.5),
 }
 
-# Temporal smoothing
+# Temporal smoothing (IoU-tracked; see box_tracker.py)
 WINDOW = 5
 PERSIST_HITS = 2
 IOU_MATCH = 0.30
@@ -114,18 +80,38 @@ def make_road_roi(size):
 
 
 ROI_MASK = make_road_roi(IMGSZ)
+
 TARGET_FPS = 10
 
+# The detectors the scheduler and motion gate select for a frame run concurrently
+INFER_WORKERS = 2
+CPU_CORES = 4
+
+# Detector scheduling: guaranteed rates per detector, the rest of the frame
+# budget goes by priority; the sign/light model backs off after SIGN_IDLE_S
+# without a hit
+SIGN_IDLE_S = 5.0
+SCHEDULE = {
+    "pedestrian": DetectorPolicy(priority=3, min_hz=8),
+    "merged": DetectorPolicy(priority=1, min_hz=3, idle_after_s=SIGN_IDLE_S, idle_hz=1.0),
+}
+
+# Motion gate: while the scene is static (mean thumbnail difference below
+# MOTION_THRESHOLD gray levels) reuse a detector's last result instead of
+# running it, for at most MAX_REUSE_S seconds. 0 disables the gate.
+MOTION_THRESHOLD = 2.0
+MAX_REUSE_S = {"pedestrian": 0.5, "merged": 1.0}
+
 # Optimize threading on Pi
 cv2.setNumThreads(1)
-torch.set_num_threads(4)
+torch.set_num_threads(max(1, CPU_CORES // INFER_WORKERS))  # split cores between concurrent models
 torch.set_num_interop_threads(1)
 
 # =========================
 # Load models
 # =========================
-merged_ls_model = YOLO("/home/sarsa/Traffic_Lights_Signs_Merged.pt")
-ped_model = YOLO("/home/sarsa/pedestrian_detection.pt")
+merged_ls_model = load_yolo("/home/sarsa/Traffic_Lights_Signs_Merged.pt", MODEL_BACKEND)
+ped_model = load_yolo("/home/sarsa/pedestrian_detection.pt", MODEL_BACKEND)
 
 # =========================
 # State tracking
@@ -137,20 +123,8 @@ last_sign_update = 0
 # =========================
 # Helper functions
 # =========================
-def letterbox(img: np.ndarray, size: int) -> np.ndarray:
-    h, w = img.shape[:2]
-    r = min(size / h, size / w)
-    nh, nw = int(h * r), int(w * r)
-    resized = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_LINEAR)
-    canvas = np.zeros((size, size, 3), dtype=np.uint8)
-    top = (size - nh) // 2
-    left = (size - nw) // 2
-    canvas[top:top + nh, left:left + nw] = resized
-    return canvas
-
-
-def yolo_infer(model: YOLO, frame: np.ndarray, classes=None):
-    inp = letterbox(frame, IMGSZ)
+def yolo_predict(model: YOLO, inp: np.ndarray, classes=None):
+    """Run YOLO on a letterboxed image or LetterboxPreprocessor tensor; returns Ultralytics result object."""
     return model.predict(
         inp,
         device="cpu",
@@ -163,38 +137,6 @@ def yolo_infer(model: YOLO, frame: np.ndarray, classes=None):
     )[0]
 
 
-def iou(box_a, box_b):
-    xa1, ya1, xa2, ya2 = box_a
-    xb1, yb1, xb2, yb2 = box_b
-    inter_w = max(0, min(xa2, xb2) - max(xa1, xb1))
-    inter_h = max(0, min(ya2, yb2) - max(ya1, yb1))
-    inter = inter_w * inter_h
-    if inter <= 0:
-        return 0.0
-    area_a = (xa2 - xa1) * (ya2 - ya1)
-    area_b = (xb2 - xb1) * (yb2 - yb1)
-    return inter / max(area_a + area_b - inter, 1e-6)
-
-
-def box_ok(det_type, box, conf):
-    x1, y1, x2, y2 = map(int, box)
-    w, h = max(1, x2 - x1), max(1, y2 - y1)
-    area = w * h
-    if conf < TH_CONF[det_type]:
-        return False
-    if area < MIN_AREA[det_type]:
-        return False
-    ratio = h / float(w)
-    rmin, rmax = ASPECT_LIMITS[det_type]
-    if not (rmin <= ratio <= rmax):
-        return False
-    if ROI_MASK is not None:
-        cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-        if not (0 <= cx < ROI_MASK.shape[1] and 0 <= cy < ROI_MASK.shape[0] and ROI_MASK[cy, cx] == 1):
-            return False
-    return True
-
-
 def extract_speed_limit(cls_name: str, mph_min: int = 5, mph_max: int = 90):
     s = cls_name.lower()
     m = re.search(r'(\d{2,3})\s*mph', s)
@@ -208,6 +150,14 @@ def extract_speed_limit(cls_name: str, mph_min: int = 5, mph_max: int = 90):
     return None
 
 
+def sign_speed_limit(cls_name: str):
+    """MPH for speed-limit sign classes (50 when the label has no number), else None."""
+    s = cls_name.lower()
+    if "speed" in s or "limit" in s:
+        return extract_speed_limit(s) or 50
+    return None
+
+
 def is_light_class(name: str) -> bool:
     s = name.lower()
     if "traffic_light" in s or "tl_" in s:
@@ -226,28 +176,13 @@ def effective_type_for(name: str) -> str:
     return "light" if is_light_class(name) else "sign"
 
 
-class TemporalSmoother:
-    def __init__(self, window=WINDOW, hits=PERSIST_HITS, iou_match=IOU_MATCH):
-        self.window = window
-        self.hits = hits
-        self.iou_match = iou_match
-        self.history = defaultdict(lambda: defaultdict(lambda: deque(maxlen=window)))
-
-    def update_and_accept(self, det_type, class_name, boxes):
-        dq = self.history[det_type][class_name]
-        dq.append(boxes)
-        accepted = []
-        for b in boxes:
-            count = 1
-            for past in list(dq)[:-1]:
-                if any(iou(b[:4], pb[:4]) >= self.iou_match for pb in past):
-                    count += 1
-            if count >= self.hits:
-                accepted.append(b)
-        return accepted
-
-
-smoother = TemporalSmoother()
+tracker = BoxTracker(WINDOW, PERSIST_HITS, IOU_MATCH)
+det_filter = DetectionFilter(TH_CONF, MIN_AREA, ASPECT_LIMITS, ROI_MASK)
+# Type / speed limit / label per class index, worked out once per model
+CLASS_META = {
+    "merged": ClassMetadata(merged_ls_model.names, effective_type_for, sign_speed_limit),
+    "pedestrian": ClassMetadata(ped_model.names, "pedestrian"),
+}
 
 
 def summarize_detections(results_dict):
@@ -284,7 +219,11 @@ class FrameGrabber:
             pass
         if not self.cap.isOpened():
             raise RuntimeError("Failed to open stream (URL/FFmpeg/OpenCV).")
-        self.q = deque(maxlen=1)
+        # Newest frame with its sequence number and capture time
+        self.cond = threading.Condition()
+        self.frame = None
+        self.seq = 0
+        self.stamp = 0.0
         self.running = True
         self.th = threading.Thread(target=self._loop, daemon=True)
         self.th.start()
@@ -297,10 +236,30 @@ class FrameGrabber:
                 continue
             if frame.ndim == 2:
                 frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
-            self.q.append(frame)
+            with self.cond:
+                self.frame, self.seq, self.stamp = frame, self.seq + 1, time.time()
+                self.cond.notify_all()
+
+    def read_latest(self):
+        """(seq, capture timestamp, frame) or None"""
+        with self.cond:
+            return (self.seq, self.stamp, self.frame) if self.frame is not None else None
+
+    def read_new(self, after_seq, timeout=None):
+        """Block until a frame newer than after_seq arrives; (seq, timestamp, frame) or None on timeout"""
+        with self.cond:
+            # seq is 0 before the first frame; never hand out (0, 0.0, None)
+            if not self.cond.wait_for(lambda: self.frame is not None and self.seq > after_seq, timeout):
+                return None
+            return self.seq, self.stamp, self.frame
 
     def read(self):
-        return self.q[-1] if self.q else None
+        latest = self.read_latest()
+        return latest[2] if latest else None
+
+    def still_valid(self, seq):
+        # Every frame is a new array, never overwritten in place
+        return True
 
     def release(self):
         self.running = False
@@ -317,87 +276,109 @@ class FrameGrabber:
 def main():
     global pedestrian_active, last_sign_update
 
-    grab = FrameGrabber(STREAM_URL)
+    if FRAME_SERVER:
+        grab = SharedFrameGrabber(FRAME_SERVER)
+    elif GRABBER_MODE == "mjpeg":
+        grab = MjpegGrabber(STREAM_URL, imgsz=IMGSZ)
+    else:
+        grab = FrameGrabber(STREAM_URL)
     print("Stream opened successfully.")
     frame_idx = 0
-    k = 0
     last_print = 0.0
     last_results = {"merged": None, "pedestrian": None}
+    last_seen = {name: False for name in last_results}  # stable track at the detector's last run
+    engine = InferenceEngine(
+        {
+            "merged": (merged_ls_model, None),
+            "pedestrian": (ped_model, None),
+        },
+        # Per-detector ROI crop letterboxed into reused buffers, handed to the
+        # model as a ready RGB 0..1 tensor (ultralytics skips its own
+        # letterbox/normalize); boxes come back in full-frame IMGSZ coordinates.
+        # The merged model covers both the light and the sign ROI. Exported
+        # (static-shape) backends get the crop padded to IMGSZ x IMGSZ.
+        preprocess=roi_preprocessors(IMGSZ, {
+            "merged": detector_roi("merged"),
+            "pedestrian": detector_roi("pedestrian"),
+        }, square=static_input(MODEL_BACKEND)),
+        predict=yolo_predict,
+        workers=INFER_WORKERS,
+    )
+    scheduler = DetectorScheduler(SCHEDULE, TARGET_FPS, parallel=INFER_WORKERS)
+    frame_stats = FrameStats()
+    motion_gate = MotionGate(MAX_REUSE_S, threshold=MOTION_THRESHOLD)
+    last_seq = -1
+    last_discard_warn = 0.0
 
     try:
         while True:
             loop_start = time.perf_counter()
-            frame = grab.read()
-            if frame is None:
-                time.sleep(0.002)
+            # Block for a frame we haven't processed yet
+            got = grab.read_new(last_seq, timeout=1.0)
+            if got is None:
                 continue
+            last_seq, captured_at, frame = got
+
+            # Detectors picked by priority, minimum rate and frame budget, minus
+            # those the motion gate lets reuse their result; the others keep
+            # their last result
+            names = motion_gate.filter(frame, scheduler.select())
+            # Shared-memory frames are zero-copy views: the engine checks the
+            # slot is still ours once the frame is copied into the model inputs
+            ran = engine.run(frame, names, valid=lambda: grab.still_valid(last_seq)) if names else {}
+            if ran is None:
+                # The frame server reused the slot mid-copy: skip the frame,
+                # the gate forgets these runs so they happen on the next one
+                motion_gate.forget(names)
+                if time.time() - last_discard_warn > 5.0:
+                    prep_s = engine.timings["preprocess"] / 1000.0
+                    print(f"[WARN] frame overwritten during preprocessing ({prep_s * 1000:.0f}ms, "
+                          f"ring holds {grab.hold_s() * 1000:.0f}ms): "
+                          f"run frame_server.py with --slots {grab.slots_for(2 * prep_s)}")
+                    last_discard_warn = time.time()
+                continue
+            last_results.update(ran)
+            infer_ms = engine.timings["total"] if ran else 0.0
+            frame_stats.update(last_seq, captured_at)
 
-            # Round-robin: 2 models
-            sel = k % 2
-            t0 = time.perf_counter()
-            if sel == 0:
-                last_results["merged"] = yolo_infer(merged_ls_model, frame)
-            else:
-                last_results["pedestrian"] = yolo_infer(ped_model, frame)
-            infer_ms = (time.perf_counter() - t0) * 1000.0
-
-            pedestrian_detected = False
-
-            for det_key, res in last_results.items():
-                if res is None or res.boxes is None or len(res.boxes) == 0:
-                    continue
-
-                names = res.names
-                xyxy = res.boxes.xyxy
-                conf = res.boxes.conf
-                cls = res.boxes.cls
-
-                if hasattr(xyxy, "cpu"): xyxy = xyxy.cpu().numpy()
-                if hasattr(conf, "cpu"): conf = conf.cpu().numpy()
-                if hasattr(cls, "cpu"): cls = cls.cpu().numpy()
+            seen_types = set()
 
+            # Only results computed on this frame feed the tracker: a reused
+            # one (scheduler skip, motion gate) would match its own boxes at
+            # IoU 1.0 and pass the persistence gate without a second detection
+            for det_key, res in ran.items():
+                meta = CLASS_META[det_key]
                 if det_key == "merged":
-                    buckets = defaultdict(lambda: defaultdict(list))
-                    for i in range(len(cls)):
-                        cls_name = names[int(cls[i])]
-                        eff_type = effective_type_for(cls_name)
-                        box = xyxy[i].tolist()
-                        c = float(conf[i])
-                        if box_ok(eff_type, box, c):
-                            buckets[eff_type][cls_name].append(box + [c])
-
-                    for eff_type, cls_map in buckets.items():
-                        for cls_name, boxes in cls_map.items():
-                            stable = smoother.update_and_accept(eff_type, cls_name, boxes)
-                            if not stable:
-                                continue
-                            if eff_type == "sign":
-                                now = time.time()
-                                if now - last_sign_update > 2.0:
-                                    cls_lower = cls_name.lower()
-                                    if "speed" in cls_lower or "limit" in cls_lower:
-                                        limit_val = extract_speed_limit(cls_lower) or 50
-                                        update_traffic_sign_via_api("speed_limit", str(limit_val), f"{frame_idx}m")
-                                        update_speed_limit(limit_val)
-                                        print(f"[SIGN] speed_limit {limit_val} MPH detected & updated")
-                                    else:
-                                        update_traffic_sign_via_api(cls_lower, "", f"{frame_idx}m")
-                                        print(f"[SIGN] {cls_lower} detected (generic)")
-                                    last_sign_update = now
+                    # Vectorized filter; light vs sign comes from the class metadata
+                    for (eff_type, cls), boxes in det_filter.filter_result(res, meta).items():
+                        stable = tracker.update_and_accept(eff_type, cls, boxes)
+                        if not stable:
+                            continue
+                        seen_types.add(det_key)
+                        if eff_type == "sign":
+                            now = time.time()
+                            if now - last_sign_update > 2.0:
+                                cls_lower = meta.labels[cls]
+                                limit_val = int(meta.speed_limit[cls])
+                                if limit_val:
+                                    update_speed_limit(limit_val)
+                                    print(f"[SIGN] speed_limit {limit_val} MPH detected & updated")
+                                else:
+                                    update_traffic_sign_via_api(cls_lower, "", f"{frame_idx}m")
+                                    print(f"[SIGN] {cls_lower} detected (generic)")
+                                last_sign_update = now
 
                 else:  # pedestrian
-                    cls_to_boxes = defaultdict(list)
-                    for i in range(len(cls)):
-                        cls_name = names[int(cls[i])]
-                        box = xyxy[i].tolist()
-                        c = float(conf[i])
-                        if box_ok("pedestrian", box, c):
-                            cls_to_boxes[cls_name].append(box + [c])
-
-                    for cls_name, boxes in cls_to_boxes.items():
-                        stable = smoother.update_and_accept("pedestrian", cls_name, boxes)
+                    for (_, cls), boxes in det_filter.filter_result(res, meta).items():
+                        stable = tracker.update_and_accept("pedestrian", cls, boxes)
                         if stable:
-                            pedestrian_detected = True
+                            seen_types.add(det_key)
+
+            for det_type in ran:
+                scheduler.observe(det_type, det_type in seen_types)
+                last_seen[det_type] = det_type in seen_types
+            # Detectors that didn't run this loop keep their last verdict
+            pedestrian_detected = last_seen["pedestrian"]
 
             if pedestrian_detected and not pedestrian_active:
                 update_alert_via_api("pedestrian", 1)
@@ -409,16 +390,18 @@ def main():
                 print("[CLEAR] Pedestrian cleared")
 
             frame_idx += 1
-            k += 1
 
             loop_ms = (time.perf_counter() - loop_start) * 1000.0
+            if ran:
+                scheduler.record(engine.timings, loop_ms)
             now = time.time()
             if now - last_print > 1.0:
                 det_flag, det_summary = summarize_detections(last_results)
                 eff_fps = 1000.0 / max(loop_ms, 1.0)
                 print(
-                    f"Frame {frame_idx} | model {infer_ms:.0f}ms | "
-                    f"loop {loop_ms:.0f}ms | FPS={eff_fps:.1f} | "
+                    f"Frame {frame_idx} | model {infer_ms:.0f}ms ({engine.timing_summary()}) | "
+                    f"loop {loop_ms:.0f}ms | FPS={eff_fps:.1f} | {frame_stats.summary()} | "
+                    f"gate {motion_gate.summary()} | "
                     f"{('Detected: ' + det_summary) if det_flag else 'Detected: none'}"
                 )
                 last_print = now
@@ -435,6 +418,7 @@ def main():
         if pedestrian_active:
             update_alert_via_api("pedestrian", 0)
         grab.release()
+        engine.close()
         cv2.destroyAllWindows()
         print("Clean shutdown.")
 
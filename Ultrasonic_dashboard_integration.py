@@ -1,7 +1,6 @@
 from gpiozero import DistanceSensor
 import tkinter as tk
 from tkinter import font
-import requests
 import time
 import gpiod
 import time
@@ -40,22 +39,9 @@ def send_pwm(line, pulse_width_ms, duration_s):
 # -----------------------------
 # API Configuration
 # -----------------------------
-BASE_URL = "http://localhost:8080"
-
-def update_alert_via_api(alert_type, status):
-    """Update alert status via Flask API."""
-    try:
-        response = requests.post(
-            f"{BASE_URL}/update_alert",
-            json={"type": alert_type, "status": 1 if status else 0},
-            timeout=1
-        )
-        if response.status_code == 200:
-            print(f"[API] Updated {alert_type} → {status}")
-        else:
-            print(f"[API] Error: {response.status_code}")
-    except Exception as e:
-        print(f"[API] Failed to update: {e}")
+# Shared non-blocking client; repeated states are coalesced, so calling
+# this every loop only sends when an alert actually changes
+from dashboard_client import update_alert_via_api
 
 # -----------------------------
 # Sensor setup
@@ -24,9 +24,26 @@ MJPG_PID=$!
 
 sleep 2  # give it a moment to start
 
+# ----------- FRAME SERVER (optional) ----------- #
+# Decode each camera once into shared memory; set FRAME_SERVER = "front" in camera_test.py
+# (and FRAME_SERVERS = ("right", "left") in lane_assist_dashboard.py) to read from it
+#/usr/bin/python3 /home/sarsa/frame_server.py --name front --source "http://127.0.0.1:8090/?action=stream" &
+#/usr/bin/python3 /home/sarsa/frame_server.py --name right --source picamera2:0 &
+#/usr/bin/python3 /home/sarsa/frame_server.py --name left --source picamera2:1 &
+
 # ----------- BACKEND ----------- #
 echo "Starting backend..."
-python3 /home/sarsa/dashtest_new/dashtest/backend_server/app.py &  # <-- replace with actual filename
+# serve.py = production eventlet/gevent server (pip install eventlet in the venv);
+# without either, fall back to app.py, the debug/reloader dev server
+BACKEND_DIR=/home/sarsa/dashtest_new/dashtest/backend_server
+if python3 -c "import eventlet" 2>/dev/null; then
+    python3 $BACKEND_DIR/serve.py &  # <-- replace with actual filename
+elif python3 -c "import gevent" 2>/dev/null; then
+    ASYNC_MODE=gevent python3 $BACKEND_DIR/serve.py &
+else
+    echo "eventlet/gevent not installed: starting the dev server (app.py)"
+    python3 $BACKEND_DIR/app.py &
+fi
 BACKEND_PID=$!
 sleep 3  # give backend time to start
 
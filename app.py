@@ -1,4 +1,7 @@
 import os
+import json
+import time
+import atexit
 from flask import Flask, jsonify, request
 from flask_socketio import SocketIO, emit
 from flask_cors import CORS
@@ -6,22 +9,36 @@ from flask_cors import CORS
 # Database functions
 from db import (
     init_db,
-    get_dashboard_state,
-    update_alert,
-    record_speed,
-    update_sign,
-    add_sign,
     clear_database,
-    get_all_alerts
+    get_speed_history,
+    SPEED_RESOLUTIONS
 )
+from dashboard_state import DashboardState, SIGN_UPDATED, SIGN_UNKNOWN, SIGN_INACTIVE
+from broadcast import PatchStream, BroadcastScheduler, SAFETY_ALERTS
+from ipc_bus import IpcSubscriber
+from app_logging import setup_logging, get_logger, recent_logs, LOG_LEVEL, DIAGNOSTICS
+
+setup_logging()
+log = get_logger("app")
 
 app = Flask(__name__)
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+# serve.py sets SOCKETIO_ASYNC_MODE (eventlet/gevent); the dev server auto-detects
+socketio = SocketIO(app, cors_allowed_origins="*",
+                    async_mode=os.environ.get('SOCKETIO_ASYNC_MODE') or None)
 
 # Initialize database
 init_db()
 
+# In-memory dashboard state; changes are written behind to dashboard.db
+dashboard = DashboardState()
+dashboard.load()
+dashboard.start()
+atexit.register(dashboard.stop)
+
+# Sequence-numbered deltas for Socket.IO clients
+patches = PatchStream()
+
 # --------- ALERT CONFIG ---------
 ALERT_IDS = {
     "pedestrian": 1,
@@ -51,6 +68,23 @@ def normalize_alert_name(name: str):
     }
     return mapping.get(name, name)
 
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def parse_int(value):
+    """Integers arrive from JSON as 3, 3.0 or "3"; returns the int or None (bools, 3.5, "x")"""
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    if is_number(value) and float(value).is_integer():
+        return int(value)
+    return None
+
+# update_sign() result -> (error message, HTTP status)
+SIGN_UPDATE_ERRORS = {
+    SIGN_UNKNOWN: ("Unknown sign ID: {sign_id}", 404),
+    SIGN_INACTIVE: ("Sign {sign_id} is not active and can't be reactivated", 409),
+}
+
 def get_dashboard_state_for_frontend():
     """
     Return full dashboard state including:
@@ -58,27 +92,42 @@ def get_dashboard_state_for_frontend():
     - speed
     - signs
     """
-    print("[DEBUG] get_dashboard_state_for_frontend() called")
-    state = get_dashboard_state()  # From db.py
-    print(f"[DEBUG] Raw state from db: {state}")
+    state = dashboard.snapshot()  # In-memory, no DB reads
     
-    # state['activeAlerts'] is a dict like {1: 0, 2: 1, 3: 0, 4: 0}
+    # state['alerts'] is a dict like {'pedestrian': 0, 'collision': 1, ...}
     # Convert to array of alert metadata objects for frontend
     active_alerts = []
-    for alert_id, status in state.get('activeAlerts', {}).items():
-        print(f"[DEBUG] Processing alert_id={alert_id}, status={status}")
+    for alert_type, status in state['alerts'].items():
+        alert_id = ALERT_IDS[alert_type]
         if status == 1:
             active_alerts.append(ALERTS_META[alert_id])
-            print(f"[DEBUG] Added alert: {ALERTS_META[alert_id]}")
     
     result = {
         "activeAlerts": active_alerts,  # Array of alert objects
-        "speed": state.get("speed", 0),
-        "signs": state.get("signs", [])
+        "speed": state["speed"],
+        "signs": state["signs"]
     }
-    print(f"[DEBUG] Returning state: {result}")
     return result
 
+def broadcast_state():
+    """Send connected clients a 'state_patch' with only the changed fields"""
+    patch = patches.patch(get_dashboard_state_for_frontend)
+    if patch is None:
+        return False
+    socketio.emit('state_patch', patch)
+    return True
+
+# Clients get the loaded state in full on connect; patch from there
+patches.prime(get_dashboard_state_for_frontend())
+
+# Merge bursts of mutations into one emit per display frame
+scheduler = BroadcastScheduler(broadcast_state)
+scheduler.start()
+atexit.register(scheduler.stop)
+
+# Signs that time out disappear from connected dashboards too
+dashboard.on_signs_expired = lambda sign_ids: scheduler.request()
+
 # --------- ROUTES ---------
 @app.route('/update_alert', methods=['POST'])
 def update_alert_route():
@@ -86,35 +135,27 @@ def update_alert_route():
     alert_type = normalize_alert_name(data.get('type'))
     status = data.get('status')
 
-    print(f"\n[ROUTE] /update_alert called")
-    print(f"[ROUTE] Raw data: {data}")
-    print(f"[ROUTE] Normalized alert_type: {alert_type}, status: {status}")
+    log.debug("/update_alert", extra={"fields": {"raw": data, "type": alert_type, "status": status}})
 
     if not alert_type or status is None:
-        print(f"[ROUTE] ERROR: Missing data")
+        log.warning("/update_alert missing data", extra={"fields": {"raw": data}})
         return jsonify({"error": "Missing alert type or status"}), 400
 
     try:
-        print(f"[ROUTE] Calling update_alert('{alert_type}', {status})")
-        
-        # Check alerts BEFORE update
-        before = get_all_alerts()
-        print(f"[ROUTE] Alerts BEFORE update: {before}")
+        # Before/after snapshots are diagnostics only
+        before = dashboard.get_alerts() if DIAGNOSTICS else None
         
-        update_alert(alert_type, status)
+        if not dashboard.set_alert(alert_type, status):
+            return jsonify({"error": f"Unknown alert type: {alert_type}"}), 400
         
-        # Check alerts AFTER update
-        after = get_all_alerts()
-        print(f"[ROUTE] Alerts AFTER update: {after}")
+        if DIAGNOSTICS:
+            log.info("Alert updated", extra={"fields": {
+                "type": alert_type, "before": before, "after": dashboard.get_alerts()}})
         
-        dashboard_state = get_dashboard_state_for_frontend()
-        socketio.emit('dashboard_state_updated', dashboard_state)
-        print(f"[ROUTE] âœ… Alert updated successfully")
+        scheduler.request(urgent=alert_type in SAFETY_ALERTS)
         return jsonify({"message": f"Alert '{alert_type}' updated successfully"}), 200
     except Exception as e:
-        print(f"[ROUTE] âŒ Error updating alert: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error updating alert: %s", e)
         return jsonify({"error": str(e)}), 500
 
 @app.route('/update_speed', methods=['POST'])
@@ -123,22 +164,27 @@ def update_speed_route():
     speed = data.get('speed')
     if speed is None:
         return jsonify({"error": "Missing speed value"}), 400
+    if not is_number(speed):
+        return jsonify({"error": "Speed must be a number"}), 400
 
-    record_speed(speed)
-    dashboard_state = get_dashboard_state_for_frontend()
-    socketio.emit('dashboard_state_updated', dashboard_state)
+    dashboard.set_speed(speed)
+    scheduler.request()
     return jsonify({"message": "Speed updated successfully"}), 200
 
 @app.route('/update_sign', methods=['POST'])
 def update_sign_route():
     data = request.json or {}
-    sign_id = data.get('id')
-    if not sign_id:
+    if data.get('id') is None:
         return jsonify({"error": "Missing sign ID"}), 400
+    sign_id = parse_int(data['id'])
+    if sign_id is None:
+        return jsonify({"error": "Sign ID must be an integer"}), 400
 
-    update_sign(sign_id, data)
-    dashboard_state = get_dashboard_state_for_frontend()
-    socketio.emit('dashboard_state_updated', dashboard_state)
+    result = dashboard.update_sign(sign_id, data)
+    if result != SIGN_UPDATED:
+        message, status = SIGN_UPDATE_ERRORS[result]
+        return jsonify({"error": message.format(sign_id=sign_id)}), status
+    scheduler.request()
     return jsonify({"message": "Sign updated successfully"}), 200
 
 @app.route('/add_sign', methods=['POST'])
@@ -149,25 +195,226 @@ def add_sign_route():
     distance = data.get('distance')
 
     if sign_type and distance is not None:
-        add_sign(sign_type, value, distance)
-        dashboard_state = get_dashboard_state_for_frontend()
-        socketio.emit('dashboard_state_updated', dashboard_state)
+        dashboard.add_sign(sign_type, value, distance)
+        scheduler.request()
         return jsonify({"message": "Sign added successfully"}), 200
     return jsonify({"error": "Missing sign information"}), 400
 
+def set_speed_limit(value, distance):
+    """Upsert the speed limit sign; returns an error string or None"""
+    limit = parse_int(value)
+    if limit is None:
+        return "Speed limit value must be an integer"
+    # speed_limit is a singleton sign type, so this replaces the current limit
+    dashboard.add_sign('speed_limit', str(limit), distance)
+    return None
+
+# --------- BATCH INGEST ---------
+def apply_event(event):
+    """
+    Apply one ingest event to the dashboard state.
+    Returns (error, urgent): error is None on success, urgent is True for
+    safety alerts that should skip the broadcast frame budget.
+    """
+    if not isinstance(event, dict):
+        return "Event must be an object", False
+    kind = event.get('event')
+
+    if kind == 'alert':
+        alert_type = normalize_alert_name(event.get('type'))
+        status = event.get('status')
+        if not alert_type or status is None:
+            return "Missing alert type or status", False
+        if not dashboard.set_alert(alert_type, status):
+            return f"Unknown alert type: {alert_type}", False
+        return None, alert_type in SAFETY_ALERTS
+
+    if kind == 'speed':
+        if event.get('speed') is None:
+            return "Missing speed value", False
+        if not is_number(event['speed']):
+            return "Speed must be a number", False
+        dashboard.set_speed(event['speed'])
+        return None, False
+
+    if kind == 'speed_limit':
+        return set_speed_limit(event.get('value'), event.get('distance', '50m')), False
+
+    if kind == 'add_sign':
+        if not event.get('type') or event.get('distance') is None:
+            return "Missing sign information", False
+        dashboard.add_sign(event['type'], event.get('value', ''), event['distance'])
+        return None, False
+
+    if kind == 'update_sign':
+        if event.get('id') is None:
+            return "Missing sign ID", False
+        sign_id = parse_int(event['id'])
+        if sign_id is None:
+            return "Sign ID must be an integer", False
+        result = dashboard.update_sign(sign_id, event)
+        if result != SIGN_UPDATED:
+            return SIGN_UPDATE_ERRORS[result][0].format(sign_id=sign_id), False
+        return None, False
+
+    return f"Unknown event kind: {kind}", False
+
+def apply_events(events):
+    """Apply a list of events as one batch; returns (applied, errors, urgent)"""
+    applied = 0
+    errors = []
+    urgent = False
+    with dashboard.batch():
+        for index, event in enumerate(events):
+            error, is_urgent = apply_event(event)
+            if error:
+                errors.append({"index": index, "error": error})
+            else:
+                applied += 1
+                urgent = urgent or is_urgent
+    return applied, errors, urgent
+
+@app.route('/ingest', methods=['POST'])
+def ingest_route():
+    """
+    Apply a list of mixed events in one request, e.g.
+    [{"event": "alert", "type": "collision", "status": 1},
+     {"event": "speed", "speed": 42},
+     {"event": "speed_limit", "value": 45},
+     {"event": "add_sign", "type": "stop", "value": "", "distance": "30m"},
+     {"event": "update_sign", "id": 3, "active": 0}]
+    The whole list lands in one write-behind transaction and one broadcast.
+    """
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('events')
+    if not isinstance(data, list):
+        return jsonify({"error": "Expected a list of events"}), 400
+
+    applied, errors, urgent = apply_events(data)
+    if applied:
+        scheduler.request(urgent=urgent)
+    return jsonify({"applied": applied, "errors": errors}), 200
+
+def request_body_stream():
+    """
+    Body of a streamed upload, readable line by line as it arrives.
+
+    Producers send NDJSON with chunked transfer encoding (no Content-Length).
+    werkzeug only streams such a body if the server sets wsgi.input_terminated;
+    eventlet (which Flask-SocketIO picks automatically when it's installed)
+    de-chunks wsgi.input itself but doesn't set the flag, so request.stream
+    would be empty. Read wsgi.input directly in that case.
+    """
+    if (request.headers.get('Transfer-Encoding', '').lower() == 'chunked'
+            and not request.environ.get('wsgi.input_terminated')):
+        return request.environ['wsgi.input']
+    return request.stream
+
+@app.route('/ingest/stream', methods=['POST'])
+def ingest_stream_route():
+    """
+    NDJSON variant for long-lived producers: one event per line, applied as
+    each line arrives. Broadcasts are coalesced by the scheduler.
+    """
+    stream = request_body_stream()
+    applied = 0
+    errors = []
+    for index, line in enumerate(iter(stream.readline, b'')):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            event = json.loads(line)
+        except ValueError:
+            errors.append({"index": index, "error": "Invalid JSON"})
+            continue
+        error, urgent = apply_event(event)
+        if error:
+            errors.append({"index": index, "error": error})
+            continue
+        applied += 1
+        scheduler.request(urgent=urgent)
+    return jsonify({"applied": applied, "errors": errors}), 200
+
+def ingest_ipc_batch(events):
+    """Local producers publishing over the IPC bus; same semantics as /ingest"""
+    applied, errors, urgent = apply_events(events)
+    if errors:
+        log.warning("IPC batch had errors", extra={"fields": {"errors": errors}})
+    if applied:
+        scheduler.request(urgent=urgent)
+
+# Unix socket for the sensor processes on this machine; HTTP stays available.
+# 'python3 app.py' runs this module twice (reloader parent + serving child);
+# only the child serves, so only it binds.
+reloader_parent = __name__ == '__main__' and not os.environ.get('WERKZEUG_RUN_MAIN')
+if os.environ.get('ADAS_IPC', '1') == '1' and not reloader_parent:
+    ipc = IpcSubscriber(ingest_ipc_batch)
+    ipc.start()
+    atexit.register(ipc.stop)
+
+@app.route('/speed_limit', methods=['POST'])
+def speed_limit_route():
+    """
+    Set the current speed limit in one call: {"value": 45, "distance": "50m"}.
+    Updates the single active speed_limit sign (or creates it), so the
+    broadcast patch carries only that sign.
+    """
+    data = request.json or {}
+    error = set_speed_limit(data.get('value'), data.get('distance', '50m'))
+    if error:
+        return jsonify({"error": error}), 400
+    scheduler.request()
+    return jsonify({"message": "Speed limit updated successfully"}), 200
+
 @app.route('/get_state', methods=['GET'])
 def get_state():
-    print(f"\n[ROUTE] /get_state called")
     state = get_dashboard_state_for_frontend()
-    print(f"[ROUTE] Returning state: {state}")
+    log.debug("/get_state", extra={"fields": state})
     return jsonify(state)
 
+@app.route('/speed_history', methods=['GET'])
+def speed_history_route():
+    """
+    /speed_history?from=<epoch s>&to=<epoch s>&resolution=1s|1m
+    Defaults to the last 5 minutes at 1 s resolution. Reads rollups only.
+    """
+    now = time.time()
+    end = request.args.get('to', now, type=float)
+    start = request.args.get('from', end - 300, type=float)
+    resolution = SPEED_RESOLUTIONS.get(request.args.get('resolution', '1s'))
+    if resolution is None:
+        return jsonify({"error": f"resolution must be one of {sorted(SPEED_RESOLUTIONS)}"}), 400
+    if start > end:
+        return jsonify({"error": "'from' must not be after 'to'"}), 400
+
+    # Include samples still waiting in the write-behind buffer
+    dashboard.flush()
+    return jsonify({
+        "from": start,
+        "to": end,
+        "resolution": request.args.get('resolution', '1s'),
+        "points": get_speed_history(start, end, resolution)
+    })
+
+@app.route('/logs', methods=['GET'])
+def logs_route():
+    limit = request.args.get('limit', 100, type=int)
+    return jsonify(recent_logs(limit))
+
+@app.route('/broadcast_stats', methods=['GET'])
+def broadcast_stats():
+    return jsonify(scheduler.stats())
+
 @app.route('/clear_database', methods=['POST'])
 def clear_database_route():
     try:
+        # Persist buffered changes first so the reset isn't overwritten
+        dashboard.flush()
         clear_database()
-        dashboard_state = get_dashboard_state_for_frontend()
-        socketio.emit('dashboard_state_updated', dashboard_state)
+        dashboard.load()
+        scheduler.request()
         return jsonify({"message": "Database cleared successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -175,13 +422,16 @@ def clear_database_route():
 # --------- SOCKET.IO ---------
 @socketio.on('connect')
 def handle_connect():
-    dashboard_state = get_dashboard_state_for_frontend()
+    dashboard_state = patches.full(get_dashboard_state_for_frontend)
     emit('dashboard_state_updated', dashboard_state)
-    print("ðŸ”— Client connected, sent dashboard state")
+    log.info("Client connected, sent dashboard state")
+
+@socketio.on('request_resync')
+def handle_resync():
+    # Client saw a gap in state_patch sequence numbers
+    emit('dashboard_state_updated', patches.full(get_dashboard_state_for_frontend))
 
 # --------- MAIN ---------
 if __name__ == '__main__':
-    print("\n" + "=" * 60)
-    print("STARTING FLASK APP WITH DEBUG LOGGING")
-    print("=" * 60 + "\n")
+    log.info("Starting Flask app", extra={"fields": {"level": LOG_LEVEL, "diagnostics": DIAGNOSTICS}})
     socketio.run(app, debug=True, port=8080, host='0.0.0.0', allow_unsafe_werkzeug=True)
@@ -0,0 +1,90 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from collections import deque
+
+# LOG_LEVEL=DEBUG brings back the per-request tracing; INFO is the default.
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+
+# DASHBOARD_DIAGNOSTICS=1 turns on the extra verification queries/reads that
+# used to run on every request (e.g. re-reading an alert after writing it).
+DIAGNOSTICS = os.environ.get("DASHBOARD_DIAGNOSTICS", "0") == "1"
+
+# Most recent records kept in memory for /logs
+RING_SIZE = 500
+
+_ring = deque(maxlen=RING_SIZE)
+_ring_lock = threading.Lock()
+_listener = None
+
+
+class StructuredFormatter(logging.Formatter):
+    """'time LEVEL logger: message key=value ...' using the record's fields"""
+
+    def format(self, record):
+        line = f"{self.formatTime(record)} {record.levelname} {record.name}: {record.getMessage()}"
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class RingBufferHandler(logging.Handler):
+    """Keep the last RING_SIZE records as dicts for inspection over HTTP"""
+
+    def emit(self, record):
+        entry = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        with _ring_lock:
+            _ring.append(entry)
+
+
+def setup_logging(level=None):
+    """
+    Configure the 'dashboard' logger tree once: records are level-gated,
+    copied into the ring buffer and handed to a queue so the actual stderr
+    write happens on a background thread, off the request path.
+    """
+    global _listener
+    root = logging.getLogger("dashboard")
+    root.setLevel(level or LOG_LEVEL)
+    if _listener is not None:
+        return root
+
+    sink = logging.StreamHandler(sys.stderr)
+    sink.setFormatter(StructuredFormatter())
+
+    log_queue = queue.SimpleQueue()
+    root.addHandler(RingBufferHandler())
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, sink)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return root
+
+
+def get_logger(name):
+    """Logger under the 'dashboard' tree, e.g. get_logger('db')"""
+    return logging.getLogger(f"dashboard.{name}")
+
+
+def recent_logs(limit=100):
+    """Newest-last list of the most recent structured records"""
+    with _ring_lock:
+        entries = list(_ring)
+    return entries[-limit:]
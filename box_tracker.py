@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+IoU tracker with persistence gating (replaces TemporalSmoother).
+
+Detections of the same (det_type, class name) are associated with the
+existing tracks of that class by greedy highest-IoU matching on a NumPy
+IoU matrix (SORT-style, without the motion model), so each detection gets
+a track ID that stays stable across frames.
+
+The acceptance rule is the smoother's: a detection is accepted once its
+track was matched in >= hits of the last `window` updates of its class.
+Each track keeps that history as a bit mask, so the state is a handful of
+fixed-size arrays (max_tracks slots) instead of deques of past boxes.
+
+    tracker = BoxTracker(window=WINDOW, hits=PERSIST_HITS, iou_match=IOU_MATCH)
+    ids, stable = tracker.update("pedestrian", "person", boxes)  # [[x1, y1, x2, y2, conf], ...]
+    accepted = tracker.update_and_accept("sign", "stop", boxes)  # drop-in for the smoother
+"""
+import numpy as np
+
+MAX_TRACKS = 64
+BYTE_POPCOUNT = np.array([bin(b).count("1") for b in range(256)], dtype=np.int32)
+
+
+def iou_matrix(a, b):
+    """IoU between every row of (N, 4) `a` and (M, 4) `b`"""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+def popcount(masks):
+    """Set bits in each hit mask of an int array (masks fit in 32 bits)"""
+    as_bytes = np.ascontiguousarray(masks, dtype=np.uint32).view(np.uint8).reshape(-1, 4)
+    return BYTE_POPCOUNT[as_bytes].sum(axis=1)
+
+
+class BoxTracker:
+    def __init__(self, window=5, hits=2, iou_match=0.3, max_tracks=MAX_TRACKS):
+        if not 1 <= window <= 32:
+            raise ValueError("window must be 1..32 updates")
+        self.window = window
+        self.hits = hits
+        self.iou_match = iou_match
+        self.history_bits = (1 << window) - 1
+
+        # Track slots; key == -1 marks a free slot
+        self.boxes = np.zeros((max_tracks, 4), dtype=np.float64)
+        self.key = np.full(max_tracks, -1, dtype=np.int32)
+        self.mask = np.zeros(max_tracks, dtype=np.int64)
+        self.track_id = np.zeros(max_tracks, dtype=np.int64)
+        self.last_update = np.zeros(max_tracks, dtype=np.int64)
+
+        self.keys = {}  # (det_type, class name) -> key id
+        self.updates = 0
+        self.next_id = 1
+        self.evicted = 0
+
+    def _new_track(self, key, box):
+        free = np.flatnonzero(self.key < 0)
+        if len(free):
+            slot = free[0]
+        else:
+            # Full: reuse the slot that was updated longest ago
+            slot = int(np.argmin(self.last_update))
+            self.evicted += 1
+        self.key[slot] = key
+        self.boxes[slot] = box
+        self.mask[slot] = 1
+        self.track_id[slot] = self.next_id
+        self.last_update[slot] = self.updates
+        self.next_id += 1
+        return slot
+
+    def update(self, det_type, class_name, boxes):
+        """
+        Associate this update's boxes of one class with its tracks.
+        Returns (track id per box, accepted per box) arrays.
+        """
+        self.updates += 1
+        key = self.keys.setdefault((det_type, class_name), len(self.keys))
+        slots = np.flatnonzero(self.key == key)
+
+        # One update older: shift the hit history, drop tracks with no hits left
+        if len(slots):
+            self.mask[slots] = (self.mask[slots] << 1) & self.history_bits
+            gone = slots[self.mask[slots] == 0]
+            self.key[gone] = -1
+            slots = slots[self.mask[slots] != 0]
+
+        n = len(boxes)
+        ids = np.zeros(n, dtype=np.int64)
+        if n == 0:
+            return ids, np.zeros(0, dtype=bool)
+        dets = np.asarray(boxes, dtype=np.float64)[:, :4]
+        assigned = np.full(n, -1, dtype=np.intp)
+
+        if len(slots):
+            ious = iou_matrix(dets, self.boxes[slots])
+            # Greedy: best remaining pair first, one track per detection
+            for _ in range(min(n, len(slots))):
+                i, j = np.unravel_index(np.argmax(ious), ious.shape)
+                if ious[i, j] < self.iou_match:
+                    break
+                assigned[i] = slots[j]
+                ious[i, :] = -1.0
+                ious[:, j] = -1.0
+
+        for i in range(n):
+            slot = assigned[i]
+            if slot < 0:
+                assigned[i] = self._new_track(key, dets[i])
+            else:
+                self.boxes[slot] = dets[i]
+                self.mask[slot] |= 1
+                self.last_update[slot] = self.updates
+        ids[:] = self.track_id[assigned]
+        # Matches in the window = set bits of the hit mask
+        stable = popcount(self.mask[assigned]) >= self.hits
+        return ids, stable
+
+    def update_and_accept(self, det_type, class_name, boxes):
+        """Boxes whose track has persisted long enough (TemporalSmoother API)"""
+        _, stable = self.update(det_type, class_name, boxes)
+        return [box for box, ok in zip(boxes, stable) if ok]
+
+    def active(self):
+        return int(np.count_nonzero(self.key >= 0))
+
+    def stats(self):
+        return {"active": self.active(), "created": self.next_id - 1, "evicted": self.evicted}
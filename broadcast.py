@@ -0,0 +1,177 @@
+import threading
+import time
+
+from app_logging import get_logger
+
+log = get_logger("broadcast")
+
+# Top-level fields of the frontend state that are diffed independently.
+# 'signs' is diffed per sign ID instead: a patch carries 'signsUpserted'
+# (new or changed signs) and 'signsRemoved' (IDs) rather than the full list.
+PATCH_FIELDS = ("activeAlerts", "speed")
+
+
+class PatchStream:
+    """
+    Versioned delta protocol for Socket.IO broadcasts.
+
+    Each broadcast becomes a 'state_patch' carrying only the fields that
+    changed since the previous one, plus a sequence number. A client that
+    sees a gap in the sequence asks for a full resync, which is sent as
+    'dashboard_state_updated' stamped with the current sequence number.
+    """
+
+    def __init__(self):
+        self.seq = 0
+        self._last = {}
+        self._last_signs = {}  # sign_id -> sign as last broadcast
+        self._lock = threading.Lock()
+
+    def prime(self, state):
+        """Set the diff baseline (e.g. the state loaded at startup) without emitting"""
+        with self._lock:
+            self._last = {field: state[field] for field in PATCH_FIELDS if field in state}
+            self._last_signs = {sign["id"]: sign for sign in state.get("signs", [])}
+
+    def patch(self, get_state):
+        """Return the next patch for get_state(), or None if nothing changed"""
+        with self._lock:
+            # Snapshot under the lock too, so a full() can't slip in between
+            state = get_state()
+            changes = {
+                field: state[field]
+                for field in PATCH_FIELDS
+                if field in state and self._last.get(field) != state[field]
+            }
+            self._last.update(changes)
+
+            if "signs" in state:
+                current = {sign["id"]: sign for sign in state["signs"]}
+                upserted = [sign for sign in state["signs"] if self._last_signs.get(sign["id"]) != sign]
+                removed = [sign_id for sign_id in self._last_signs if sign_id not in current]
+                if upserted:
+                    changes["signsUpserted"] = upserted
+                if removed:
+                    changes["signsRemoved"] = removed
+                self._last_signs = current
+
+            if not changes:
+                return None
+            self.seq += 1
+            return {"seq": self.seq, "changes": changes}
+
+    def full(self, get_state):
+        """
+        Full state for a (re)syncing client, stamped with the current seq.
+
+        get_state is called with the lock held, so no patch can be numbered
+        between taking the snapshot and reading seq: the client's next patch
+        is always relative to exactly the state it was sent.
+        """
+        with self._lock:
+            return dict(get_state(), seq=self.seq)
+
+
+# Mutations inside one frame budget are merged into a single emit
+FRAME_BUDGET_MS = 33
+
+# Safety alerts bypass the frame budget and go out within this latency
+SAFETY_MAX_LATENCY_MS = 5
+SAFETY_ALERTS = ("collision", "pedestrian")
+
+
+class BroadcastScheduler:
+    """
+    Coalesce dashboard broadcasts to display rate.
+
+    Routes call request() after mutating state. The first request in a frame
+    arms a deadline FRAME_BUDGET_MS out; everything that arrives before it
+    goes out in one emit. Urgent requests (safety alerts) pull the deadline
+    in to SAFETY_MAX_LATENCY_MS. emit_fn should return True if it emitted.
+    """
+
+    def __init__(self, emit_fn, frame_ms=FRAME_BUDGET_MS, urgent_ms=SAFETY_MAX_LATENCY_MS):
+        self.emit_fn = emit_fn
+        self.frame = frame_ms / 1000.0
+        self.urgent = urgent_ms / 1000.0
+
+        self._cond = threading.Condition()
+        self._deadline = None
+        self._running = False
+        self._thread = None
+
+        self.requests = 0
+        self.urgent_requests = 0
+        self.flushes = 0
+        self.emits = 0
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the scheduler, sending anything still pending"""
+        with self._cond:
+            self._running = False
+            pending = self._deadline is not None
+            self._deadline = None
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        if pending:
+            self._flush()
+
+    def request(self, urgent=False):
+        """Schedule a broadcast of the current state"""
+        with self._cond:
+            self.requests += 1
+            if urgent:
+                self.urgent_requests += 1
+            deadline = time.monotonic() + (self.urgent if urgent else self.frame)
+            # Later requests never push an armed deadline back
+            if self._deadline is None or deadline < self._deadline:
+                self._deadline = deadline
+                self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "requests": self.requests,
+                "urgent_requests": self.urgent_requests,
+                "flushes": self.flushes,
+                "emits": self.emits,
+                "emits_saved": self.requests - self.emits,
+                "frame_budget_ms": self.frame * 1000.0,
+                "safety_max_latency_ms": self.urgent * 1000.0,
+            }
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self._running:
+                    if self._deadline is None:
+                        self._cond.wait()
+                        continue
+                    remaining = self._deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if not self._running:
+                    return
+                self._deadline = None
+            self._flush()
+
+    def _flush(self):
+        try:
+            emitted = self.emit_fn()
+        except Exception as e:
+            log.exception("Emit failed: %s", e)
+            emitted = False
+        with self._cond:
+            self.flushes += 1
+            if emitted:
+                self.emits += 1
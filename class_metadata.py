@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Per-model class metadata, computed once when the model is loaded.
+
+A detector's class set is fixed (model.names), so everything the main loop
+derives from a class name - detector type (light / sign / pedestrian),
+speed-limit value, the lowercase label sent to the dashboard - is worked
+out here for every class index up front. Per detection it is then an
+array or list index instead of lower() / substring scans / re.search.
+
+    meta = ClassMetadata(merged_ls_model.names, effective_type_for, sign_speed_limit)
+    meta.type_ids[cls]      # detection_filter type id
+    meta.speed_limit[cls]   # MPH, 0 if the class isn't a speed-limit sign
+    meta.labels[cls]        # lowercase class name
+"""
+import numpy as np
+
+from detection_filter import DET_TYPES, TYPE_ID
+
+
+class ClassMetadata:
+    def __init__(self, names, type_for, speed_limit_for=None):
+        """
+        names: {class index: name} as on the model / result.
+        type_for: fixed detector type, or a function of the class name.
+        speed_limit_for: function of the class name -> MPH or None.
+        """
+        self.names = dict(names)
+        size = max(self.names) + 1 if self.names else 0
+        self.labels = [self.names.get(idx, "").lower() for idx in range(size)]
+        self.type_ids = np.array(
+            [TYPE_ID[type_for if isinstance(type_for, str) else type_for(self.names.get(idx, ""))]
+             for idx in range(size)], dtype=np.intp)
+        self.speed_limit = np.array(
+            [(speed_limit_for(self.names.get(idx, "")) or 0) if speed_limit_for else 0
+             for idx in range(size)], dtype=np.int32)
+
+    def type_name(self, cls):
+        return DET_TYPES[self.type_ids[cls]]
+
+    def __len__(self):
+        return len(self.labels)
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Shared, non-blocking client for the dashboard backend.
+
+Producers (camera, lane assist, ultrasonic) call the update_* helpers from
+their perception/control loops. Calls only enqueue an event and return
+immediately; a background sender drains the queue and posts everything
+pending as one batch, so a slow or stalled backend never costs a frame or
+delays braking. Batches go over the local IPC bus (ipc_bus.py) when the
+backend is listening on it, otherwise to /ingest over a pooled keep-alive
+HTTP session.
+
+- Alerts, speed and the speed limit are coalesced: only the newest value per
+  key is kept while waiting, and an alert state equal to the last one
+  queued/sent is skipped - for ALERT_REFRESH_S, after which it is sent again
+  so a backend that restarted or missed it catches up. A failed send also
+  forgets every alert state, so the next calls resend them.
+- The queue is bounded. On overflow the oldest non-alert event is dropped;
+  events older than MAX_EVENT_AGE_S are dropped instead of sent.
+- stats() reports queue depth, sent/dropped/failed counts and send latency.
+
+Settings (environment variables):
+    DASHBOARD_TRANSPORT   auto (default: IPC, HTTP fallback), ipc or http
+"""
+import atexit
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ipc_bus import IpcPublisher
+
+BASE_URL = "http://localhost:8080"
+API_TIMEOUT = 0.5          # per batch POST; runs on the sender thread only
+QUEUE_SIZE = 64            # max events waiting to be sent
+MAX_EVENT_AGE_S = 2.0      # older events are stale and dropped, not sent
+RETRY_BACKOFF_S = 0.25     # pause after a failed send
+ALERT_REFRESH_S = 2.0      # an unchanged alert state is resent after this long
+LATENCY_WINDOW = 200       # recent send latencies kept for stats()
+TRANSPORT = os.environ.get("DASHBOARD_TRANSPORT", "auto")
+
+
+class DashboardClient:
+    def __init__(self, base_url=BASE_URL, timeout=API_TIMEOUT, queue_size=QUEUE_SIZE,
+                 max_event_age=MAX_EVENT_AGE_S, transport=TRANSPORT):
+        if transport not in ("auto", "ipc", "http"):
+            raise ValueError(f"Unknown transport: {transport}")
+        self.base_url = base_url
+        self.timeout = timeout
+        self.queue_size = queue_size
+        self.max_event_age = max_event_age
+
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.ipc = IpcPublisher() if transport != "http" else None
+        self.http_fallback = transport != "ipc"
+
+        self._cond = threading.Condition()
+        self._pending = OrderedDict()   # key -> (enqueued_at, event)
+        self._alert_state = {}          # alert type -> (last status queued/sent, when)
+        self._in_flight = 0
+        self._running = True
+
+        self.sent = 0
+        self.sent_ipc = 0
+        self.sent_http = 0
+        self.batches = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.dropped_overflow = 0
+        self.dropped_stale = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+
+        self._thread = threading.Thread(target=self._sender_loop, daemon=True)
+        self._thread.start()
+
+    # ---------- producer API (never blocks on the network) ----------
+    def send_alert(self, alert_type, status):
+        status = 1 if status else 0
+        now = time.monotonic()
+        with self._cond:
+            last = self._alert_state.get(alert_type)
+            if last is not None and last[0] == status and now - last[1] < ALERT_REFRESH_S:
+                self.coalesced += 1
+                return
+            self._alert_state[alert_type] = (status, now)
+            self._enqueue(("alert", alert_type), {"event": "alert", "type": alert_type, "status": status})
+
+    def set_speed(self, speed):
+        with self._cond:
+            self._enqueue(("speed",), {"event": "speed", "speed": speed})
+
+    def set_speed_limit(self, limit, distance="50m"):
+        with self._cond:
+            self._enqueue(("speed_limit",), {"event": "speed_limit", "value": limit, "distance": distance})
+
+    def add_sign(self, sign_type, value, distance):
+        with self._cond:
+            # The backend dedupes signs itself; same-type repeats still coalesce here
+            self._enqueue(("sign", sign_type, value),
+                          {"event": "add_sign", "type": sign_type, "value": value, "distance": distance})
+
+    def flush(self, timeout=1.0):
+        """Wait until everything queued has been sent (or timeout)"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=1.0):
+        """Send what is queued (best effort), then stop the sender"""
+        self.flush(timeout)
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join(timeout=timeout)
+        self.session.close()
+        if self.ipc:
+            self.ipc.close()
+
+    def stats(self):
+        with self._cond:
+            latencies = sorted(self._latencies)
+            return {
+                "queue_depth": len(self._pending),
+                "sent": self.sent,
+                "sent_ipc": self.sent_ipc,
+                "sent_http": self.sent_http,
+                "batches": self.batches,
+                "failed": self.failed,
+                "coalesced": self.coalesced,
+                "dropped_overflow": self.dropped_overflow,
+                "dropped_stale": self.dropped_stale,
+                "send_ms_avg": sum(latencies) / len(latencies) if latencies else 0.0,
+                "send_ms_p99": latencies[int(0.99 * (len(latencies) - 1))] if latencies else 0.0,
+                "send_ms_max": latencies[-1] if latencies else 0.0,
+            }
+
+    # ---------- internals ----------
+    def _enqueue(self, key, event):
+        # Caller holds self._cond
+        if key in self._pending:
+            self.coalesced += 1
+            del self._pending[key]  # re-append so order follows the newest value
+        elif len(self._pending) >= self.queue_size:
+            self._drop_for_overflow()
+        self._pending[key] = (time.monotonic(), event)
+        self._cond.notify_all()
+
+    def _drop_for_overflow(self):
+        # Alerts are the last thing to give up; otherwise drop the oldest event
+        victim = next((k for k in self._pending if k[0] != "alert"), None)
+        if victim is None:
+            victim = next(iter(self._pending))
+            self._alert_state.pop(victim[1], None)
+        del self._pending[victim]
+        self.dropped_overflow += 1
+
+    def _send(self, events):
+        """Post one batch, IPC first; returns True once a transport took it"""
+        if self.ipc and self.ipc.publish(events):
+            with self._cond:
+                self.sent_ipc += len(events)
+            return True
+        if not self.http_fallback:
+            return False
+        try:
+            resp = self.session.post(f"{self.base_url}/ingest", json=events, timeout=self.timeout)
+        except requests.RequestException:
+            return False
+        if resp.status_code != 200:
+            return False
+        with self._cond:
+            self.sent_http += len(events)
+        return True
+
+    def _sender_loop(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._running and not self._pending:
+                    return
+                batch = list(self._pending.items())
+                self._pending.clear()
+                self._in_flight = len(batch)
+
+            now = time.monotonic()
+            fresh = [(key, item) for key, item in batch if now - item[0] <= self.max_event_age]
+            stale = [(key, item) for key, item in batch if now - item[0] > self.max_event_age]
+            ok = True
+            elapsed_ms = None
+            if fresh:
+                t0 = time.perf_counter()
+                ok = self._send([event for _, (_, event) in fresh])
+                elapsed_ms = (time.perf_counter() - t0) * 1000.0
+
+            with self._cond:
+                self.dropped_stale += len(stale)
+                for key, (_, event) in stale:
+                    # A dropped alert never reached the backend; forget it so
+                    # the next call with the same state is sent again
+                    last = self._alert_state.get(key[1]) if key[0] == "alert" else None
+                    if last is not None and last[0] == event["status"]:
+                        del self._alert_state[key[1]]
+                if elapsed_ms is not None:
+                    self._latencies.append(elapsed_ms)
+                    self.batches += 1
+                if ok:
+                    self.sent += len(fresh)
+                else:
+                    self.failed += len(fresh)
+                    # The backend may have lost what it got before the
+                    # failure (restart); let every alert be sent again
+                    self._alert_state.clear()
+                    # Retry unless something newer replaced it meanwhile;
+                    # the age check drops it once it goes stale
+                    for key, item in reversed(fresh):
+                        if key not in self._pending:
+                            self._pending[key] = item
+                            self._pending.move_to_end(key, last=False)
+                self._in_flight = 0
+                self._cond.notify_all()
+            if not ok:
+                time.sleep(RETRY_BACKOFF_S)
+
+
+# =========================
+# Shared default client + the helpers the producer scripts call
+# =========================
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = DashboardClient()
+            atexit.register(_client.close)
+        return _client
+
+
+def update_alert_via_api(alert_type, status):
+    """Queue an alert update (non-blocking)."""
+    get_client().send_alert(alert_type, status)
+
+
+def update_traffic_sign_via_api(sign_type, value, distance):
+    """Queue a traffic sign detection (non-blocking)."""
+    get_client().add_sign(sign_type, value, distance)
+
+
+def update_speed_limit(new_limit, distance="50m"):
+    """Queue a speed limit change (non-blocking)."""
+    get_client().set_speed_limit(new_limit, distance)
+    return True
+
+
+def update_speed_via_api(speed):
+    """Queue a speed update (non-blocking)."""
+    get_client().set_speed(speed)
@@ -0,0 +1,353 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import db
+from app_logging import get_logger
+
+log = get_logger("state")
+
+# Write-behind tuning: persist buffered changes every FLUSH_INTERVAL_MS,
+# or as soon as FLUSH_MAX_CHANGES mutations are waiting, whichever is first.
+FLUSH_INTERVAL_MS = 250
+FLUSH_MAX_CHANGES = 50
+
+# Sign lifecycle: a detection refreshes the matching active sign instead of
+# adding a row. Signs expire SIGN_TTL_S after they were last seen (None =
+# never) and at most MAX_ACTIVE_SIGNS stay active, least recently seen
+# evicted first. Types in SINGLETON_SIGN_TYPES have one active sign whose
+# value is replaced; other types are deduplicated by (type, value).
+DEFAULT_SIGN_TTL_S = 10.0
+SIGN_TTL_S = {
+    'speed_limit': None,
+}
+MAX_ACTIVE_SIGNS = 8
+SINGLETON_SIGN_TYPES = ('speed_limit',)
+
+# update_sign() results
+SIGN_UPDATED = 'updated'
+SIGN_UNKNOWN = 'unknown'
+SIGN_INACTIVE = 'inactive'
+
+
+def sign_key(sign_type, value):
+    if sign_type in SINGLETON_SIGN_TYPES:
+        return (sign_type,)
+    return (sign_type, value)
+
+
+def sign_ttl(sign_type):
+    return SIGN_TTL_S.get(sign_type, DEFAULT_SIGN_TTL_S)
+
+
+class DashboardState:
+    """
+    Authoritative in-process copy of the dashboard: the four alert flags,
+    the current speed and the active traffic signs.
+
+    Routes read and mutate this object directly; a background writer
+    batch-persists the changes to dashboard.db so requests never wait on disk.
+    """
+
+    def __init__(self, flush_interval_ms=FLUSH_INTERVAL_MS, flush_max_changes=FLUSH_MAX_CHANGES):
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.flush_max_changes = flush_max_changes
+
+        self._lock = threading.RLock()  # re-entrant so batch() can wrap mutations
+        self._wake = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()  # one flush at a time
+
+        self.alerts = {atype: 0 for atype in db.ALERT_IDS}
+        self.speed = 0
+        self.signs = {}  # sign_id -> sign dict, active signs only
+        self._sign_keys = {}  # sign_key() -> sign_id
+        self._sign_meta = {}  # sign_id -> {'key', 'seen', 'expires'}
+        self._next_sign_id = 1
+
+        # Called (outside the lock) with the IDs of signs that just expired
+        self.on_signs_expired = None
+
+        self._pending_alerts = {}
+        self._pending_speeds = []
+        self._pending_signs = {}
+        self._pending_count = 0
+
+        self._running = False
+        self._writer = None
+
+    # ---------- lifecycle ----------
+    def load(self):
+        """(Re)load state from the database, discarding anything unflushed"""
+        alerts = db.get_all_alerts()
+        speed = db.get_latest_speed()
+        signs = db.get_active_signs()
+        max_id = db.get_max_sign_id()
+        with self._lock:
+            self.alerts = {atype: alerts.get(atype, 0) for atype in db.ALERT_IDS}
+            self.speed = speed
+            self.signs = {}
+            self._sign_keys = {}
+            self._sign_meta = {}
+            self._next_sign_id = max_id + 1
+            self._clear_pending()
+
+            # Older databases may hold an unbounded active set: keep the
+            # newest sign per key, up to the cap, and deactivate the rest
+            kept = 0
+            for sign in sorted(signs, key=lambda s: s['id'], reverse=True):
+                key = sign_key(sign['type'], sign['value'])
+                if key in self._sign_keys or kept >= MAX_ACTIVE_SIGNS:
+                    self._pending_signs[sign['id']] = {'active': 0}
+                    self._mark_changed()
+                    continue
+                self._activate(sign, key, time.monotonic())
+                kept += 1
+            # Preserve the original (oldest first) display order
+            self.signs = dict(sorted(self.signs.items()))
+
+    def start(self):
+        """Start the background writer thread"""
+        if self._running:
+            return
+        self._running = True
+        self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer.start()
+
+    def stop(self):
+        """Stop the writer and persist whatever is still buffered"""
+        with self._lock:
+            self._running = False
+            self._wake.notify()
+        if self._writer is not None:
+            self._writer.join(timeout=2.0)
+            self._writer = None
+        self.flush()
+
+    # ---------- reads ----------
+    def snapshot(self):
+        """Consistent copy of the current state"""
+        with self._lock:
+            return {
+                'alerts': dict(self.alerts),
+                'speed': self.speed,
+                'signs': [dict(sign) for sign in self.signs.values()]
+            }
+
+    def get_alerts(self):
+        with self._lock:
+            return dict(self.alerts)
+
+    # ---------- mutations ----------
+    @contextmanager
+    def batch(self):
+        """
+        Hold the state lock across several mutations. Readers never see a
+        partial batch, and the writer persists it in the same transaction.
+        """
+        with self._lock:
+            yield self
+
+    def set_alert(self, alert_type, status):
+        """Set an alert flag; returns False for unknown alert types"""
+        if alert_type not in db.ALERT_IDS:
+            log.warning("Unknown alert type: %s", alert_type)
+            return False
+        with self._lock:
+            self.alerts[alert_type] = status
+            self._pending_alerts[alert_type] = status
+            self._mark_changed()
+        return True
+
+    def set_speed(self, speed):
+        with self._lock:
+            self.speed = speed
+            self._pending_speeds.append((speed, time.time()))
+            self._mark_changed()
+        return speed
+
+    def add_sign(self, sign_type, value, distance):
+        """
+        Record a sign detection. Refreshes (and updates) the matching active
+        sign if there is one, otherwise adds a new one. Returns the sign ID.
+        """
+        key = sign_key(sign_type, value)
+        now = time.monotonic()
+        with self._lock:
+            sign_id = self._sign_keys.get(key)
+            if sign_id is not None:
+                sign = self.signs[sign_id]
+                self._touch(sign_id, sign_type, now)
+                changes = {k: v for k, v in (('value', value), ('distance', distance)) if sign[k] != v}
+                if changes:
+                    sign.update(changes)
+                    self._pending_signs.setdefault(sign_id, {}).update(changes)
+                    self._mark_changed()
+                return sign_id
+
+            while len(self.signs) >= MAX_ACTIVE_SIGNS:
+                self._deactivate(self._eviction_candidate())
+
+            sign_id = self._next_sign_id
+            self._next_sign_id += 1
+            self._activate({
+                'id': sign_id,
+                'type': sign_type,
+                'value': value,
+                'distance': distance
+            }, key, now)
+            self._pending_signs[sign_id] = {
+                'new': True,
+                'type': sign_type,
+                'value': value,
+                'distance': distance,
+                'active': 1
+            }
+            self._mark_changed()
+        return sign_id
+
+    def expire_signs(self, now=None):
+        """Deactivate signs whose TTL has run out; returns their IDs"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            expired = [
+                sign_id for sign_id, meta in self._sign_meta.items()
+                if meta['expires'] is not None and meta['expires'] <= now
+            ]
+            for sign_id in expired:
+                self._deactivate(sign_id)
+        return expired
+
+    def update_sign(self, sign_id, data):
+        """
+        Update a sign's fields. Setting active to 0 removes it from the
+        active set. Signs that are not active are only updated in the database.
+        Returns SIGN_UPDATED, SIGN_UNKNOWN if no sign with that (integer) ID
+        was ever created, or SIGN_INACTIVE (nothing written) for active: 1 on
+        a sign that isn't active - new detections go through add_sign().
+        """
+        fields = {key: data[key] for key in ('type', 'value', 'distance', 'active') if key in data}
+        with self._lock:
+            if not 1 <= sign_id < self._next_sign_id:
+                return SIGN_UNKNOWN
+            if not fields:
+                return SIGN_UPDATED
+            sign = self.signs.get(sign_id)
+            if sign is None and fields.get('active'):
+                return SIGN_INACTIVE
+            if sign is not None:
+                if 'active' in fields and not fields['active']:
+                    self._deactivate(sign_id)
+                else:
+                    sign.update({k: v for k, v in fields.items() if k != 'active'})
+                    self._rekey(sign_id)
+            self._pending_signs.setdefault(sign_id, {}).update(fields)
+            self._mark_changed()
+        return SIGN_UPDATED
+
+    # ---------- sign lifecycle (caller holds self._lock) ----------
+    def _activate(self, sign, key, now):
+        self.signs[sign['id']] = sign
+        self._sign_keys[key] = sign['id']
+        self._sign_meta[sign['id']] = {'key': key}
+        self._touch(sign['id'], sign['type'], now)
+
+    def _touch(self, sign_id, sign_type, now):
+        ttl = sign_ttl(sign_type)
+        meta = self._sign_meta[sign_id]
+        meta['seen'] = now
+        meta['expires'] = None if ttl is None else now + ttl
+
+    def _deactivate(self, sign_id):
+        self.signs.pop(sign_id, None)
+        meta = self._sign_meta.pop(sign_id, None)
+        if meta is not None and self._sign_keys.get(meta['key']) == sign_id:
+            del self._sign_keys[meta['key']]
+        self._pending_signs.setdefault(sign_id, {})['active'] = 0
+        self._mark_changed()
+
+    def _rekey(self, sign_id):
+        """Refresh key/TTL after a type or value change; the older duplicate loses"""
+        sign = self.signs[sign_id]
+        meta = self._sign_meta[sign_id]
+        key = sign_key(sign['type'], sign['value'])
+        if key != meta['key']:
+            if self._sign_keys.get(meta['key']) == sign_id:
+                del self._sign_keys[meta['key']]
+            other = self._sign_keys.get(key)
+            if other is not None and other != sign_id:
+                self._deactivate(other)
+            self._sign_keys[key] = sign_id
+            meta['key'] = key
+        self._touch(sign_id, sign['type'], time.monotonic())
+
+    def _eviction_candidate(self):
+        """Least recently seen sign, preferring ones that can expire"""
+        return min(
+            self._sign_meta,
+            key=lambda sid: (self._sign_meta[sid]['expires'] is None, self._sign_meta[sid]['seen'])
+        )
+
+    # ---------- write-behind ----------
+    def flush(self):
+        """Persist all buffered changes in a single transaction"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending_count:
+                    return 0
+                alerts = self._pending_alerts
+                speeds = self._pending_speeds
+                signs = self._pending_signs
+                count = self._pending_count
+                self._clear_pending()
+            try:
+                db.persist_batch(alerts, speeds, signs)
+            except Exception as e:
+                log.error("Flush failed, will retry: %s", e)
+                self._requeue(alerts, speeds, signs, count)
+                return 0
+            return count
+
+    def _writer_loop(self):
+        while True:
+            with self._lock:
+                deadline = time.monotonic() + self.flush_interval
+                while self._running and self._pending_count < self.flush_max_changes:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._wake.wait(remaining)
+                if not self._running:
+                    return
+            expired = self.expire_signs()
+            if expired and self.on_signs_expired is not None:
+                try:
+                    self.on_signs_expired(expired)
+                except Exception:
+                    log.exception("on_signs_expired callback failed")
+            self.flush()
+
+    def _mark_changed(self):
+        # Caller holds self._lock
+        self._pending_count += 1
+        if self._pending_count >= self.flush_max_changes:
+            self._wake.notify()
+
+    def _clear_pending(self):
+        # Caller holds self._lock
+        self._pending_alerts = {}
+        self._pending_speeds = []
+        self._pending_signs = {}
+        self._pending_count = 0
+
+    def _requeue(self, alerts, speeds, signs, count):
+        """Put a failed batch back underneath any newer changes"""
+        with self._lock:
+            for atype, status in alerts.items():
+                self._pending_alerts.setdefault(atype, status)
+            self._pending_speeds[:0] = speeds
+            for sign_id, fields in signs.items():
+                newer = self._pending_signs.get(sign_id, {})
+                merged = dict(fields)
+                merged.update(newer)
+                self._pending_signs[sign_id] = merged
+            self._pending_count += count
@@ -1,181 +1,348 @@
+import queue
 import sqlite3
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
-def get_db_connection():
-    """Create a connection to the SQLite database"""
-    db_path = Path('dashboard.db')
-    conn = sqlite3.connect(str(db_path))
+from app_logging import get_logger, DIAGNOSTICS
+
+log = get_logger("db")
+
+DB_PATH = Path('dashboard.db')
+
+# Connections kept open between requests. Werkzeug/eventlet hand each request
+# to a fresh thread or greenlet, so connections are pooled rather than bound
+# to a thread; each one is only ever used by one thread at a time.
+POOL_SIZE = 8
+
+# Compiled statements cached per connection (sqlite3 keys them by SQL text)
+STATEMENT_CACHE_SIZE = 128
+
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",      # readers don't block the writer
+    "PRAGMA synchronous = NORMAL",    # fsync on checkpoint, not every commit
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -8000",      # ~8 MB page cache
+    "PRAGMA busy_timeout = 2000",
+)
+
+# Alert rows are seeded with fixed IDs 1-4
+ALERT_IDS = {
+    "pedestrian": 1,
+    "collision": 2,
+    "blindSpot": 3,
+    "laneDeparture": 4
+}
+
+# Speed time series: raw samples are kept as a bounded ring of the newest
+# SPEED_RAW_LIMIT rows; history queries read min/max/avg rollups instead.
+SPEED_RAW_LIMIT = 10000
+SPEED_ROLLUP_RETENTION = {
+    1: 24 * 3600,         # 1 s buckets, kept for a day
+    60: 30 * 24 * 3600    # 1 min buckets, kept for 30 days
+}
+SPEED_RESOLUTIONS = {'1s': 1, '1m': 60}
+SPEED_HISTORY_MAX_POINTS = 5000
+
+def get_db_connection(db_path=None):
+    """Create a new, tuned connection to the SQLite database"""
+    conn = sqlite3.connect(
+        str(db_path or DB_PATH),
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE
+    )
     conn.row_factory = sqlite3.Row  # Enable column access by name
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
     return conn
 
+class ConnectionPool:
+    """Small LIFO pool of open connections so requests skip connection setup"""
+
+    def __init__(self, db_path, size=POOL_SIZE):
+        self.db_path = Path(db_path)
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return get_db_connection(self.db_path)
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Unusable connection: drop it instead of pooling it
+            conn.close()
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        """
+        A pooled connection for one unit of work. On any error the open
+        transaction is rolled back; the connection always goes back to the pool.
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                try:
+                    conn.rollback()
+                except sqlite3.Error:
+                    pass
+            raise
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+_pool = ConnectionPool(DB_PATH)
+
+def configure_db(db_path, pool_size=POOL_SIZE):
+    """Point the module at another database file and reset the pool"""
+    global DB_PATH, _pool
+    _pool.close_all()
+    DB_PATH = Path(db_path)
+    _pool = ConnectionPool(DB_PATH, pool_size)
+
+def close_db():
+    """Close every idle pooled connection (e.g. on shutdown)"""
+    _pool.close_all()
+
 def init_db():
     """Initialize the database with required tables"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Create alerts table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS alerts (
-        id INTEGER PRIMARY KEY,
-        type TEXT NOT NULL,
-        status INTEGER DEFAULT 0,
-        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-    
-    # Create speed records table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS speed_records (
-        id INTEGER PRIMARY KEY,
-        speed INTEGER NOT NULL,
-        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-    
-    # Create traffic signs table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS traffic_signs (
-        id INTEGER PRIMARY KEY,
-        type TEXT NOT NULL,
-        value TEXT,
-        distance TEXT NOT NULL,
-        active INTEGER DEFAULT 1
-    )
-    ''')
-    
-    # Insert default alert types if they don't exist
-    default_alerts = [
-        ('pedestrian',),
-        ('collision',),
-        ('blindSpot',),
-        ('laneDeparture',)
-    ]
-    
-    cursor.execute("SELECT COUNT(*) FROM alerts")
-    if cursor.fetchone()[0] == 0:
-        cursor.executemany(
-            "INSERT INTO alerts (type, status) VALUES (?, 0)",
-            default_alerts
+    with _pool.connection() as conn:
+        cursor = conn.cursor()
+    
+        # Create alerts table
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS alerts (
+            id INTEGER PRIMARY KEY,
+            type TEXT NOT NULL,
+            status INTEGER DEFAULT 0,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
+        ''')
+    
+        # Create speed records table
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS speed_records (
+            id INTEGER PRIMARY KEY,
+            speed INTEGER NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            ts REAL
+        )
+        ''')
+    
+        # Older databases predate the epoch-seconds column
+        cursor.execute("PRAGMA table_info(speed_records)")
+        if 'ts' not in [row['name'] for row in cursor.fetchall()]:
+            cursor.execute("ALTER TABLE speed_records ADD COLUMN ts REAL")
+            cursor.execute(
+                "UPDATE speed_records SET ts = CAST(strftime('%s', timestamp) AS REAL) WHERE ts IS NULL"
+            )
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_speed_records_ts ON speed_records (ts)")
+    
+        # Per-bucket speed rollups (resolution = bucket width in seconds)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS speed_rollups (
+            resolution INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            min_speed REAL NOT NULL,
+            max_speed REAL NOT NULL,
+            sum_speed REAL NOT NULL,
+            samples INTEGER NOT NULL,
+            PRIMARY KEY (resolution, bucket)
+        ) WITHOUT ROWID
+        ''')
+    
+        # Create traffic signs table
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS traffic_signs (
+            id INTEGER PRIMARY KEY,
+            type TEXT NOT NULL,
+            value TEXT,
+            distance TEXT NOT NULL,
+            active INTEGER DEFAULT 1
+        )
+        ''')
     
-    # Insert default traffic signs if they don't exist
-    default_signs = [
-        ('speed_limit', '50', '300m'),
-        ('stop', '', '500m'),
-    ]
-    
-    cursor.execute("SELECT COUNT(*) FROM traffic_signs")
-    if cursor.fetchone()[0] == 0:
-        cursor.executemany(
-            "INSERT INTO traffic_signs (type, value, distance) VALUES (?, ?, ?)",
-            default_signs
+        # Partial index: only the (small) active set is indexed
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_traffic_signs_active ON traffic_signs (id) WHERE active = 1"
         )
     
-    conn.commit()
-    conn.close()
+        # Insert default alert types if they don't exist
+        default_alerts = [
+            ('pedestrian',),
+            ('collision',),
+            ('blindSpot',),
+            ('laneDeparture',)
+        ]
+    
+        cursor.execute("SELECT COUNT(*) FROM alerts")
+        if cursor.fetchone()[0] == 0:
+            cursor.executemany(
+                "INSERT INTO alerts (type, status) VALUES (?, 0)",
+                default_alerts
+            )
+    
+        # Insert default traffic signs if they don't exist
+        default_signs = [
+            ('speed_limit', '50', '300m'),
+            ('stop', '', '500m'),
+        ]
+    
+        cursor.execute("SELECT COUNT(*) FROM traffic_signs")
+        if cursor.fetchone()[0] == 0:
+            cursor.executemany(
+                "INSERT INTO traffic_signs (type, value, distance) VALUES (?, ?, ?)",
+                default_signs
+            )
+    
+        conn.commit()
 
 def get_all_alerts():
     """Get all alert statuses from the database - returns ALL alerts regardless of status"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with _pool.connection() as conn:
+        cursor = conn.cursor()
     
-    # FIXED: No longer filtering - get ALL alerts
-    cursor.execute("SELECT type, status FROM alerts WHERE id <= 4 ORDER BY id")
-    rows = cursor.fetchall()
+        # FIXED: No longer filtering - get ALL alerts
+        cursor.execute("SELECT type, status FROM alerts WHERE id <= 4 ORDER BY id")
+        rows = cursor.fetchall()
     
-    alerts = {}
-    for row in rows:
-        alerts[row['type']] = row['status']
-    
-    conn.close()
-    print(f"[DB] get_all_alerts() returning: {alerts}")
+        alerts = {}
+        for row in rows:
+            alerts[row['type']] = row['status']
+    log.debug("get_all_alerts", extra={"fields": alerts})
     return alerts
 
 def update_alert(alert_type, status):
     """
     Update alert status by type. Only updates existing rows (IDs 1-4).
     """
-    ALERT_IDS = {
-        "pedestrian": 1,
-        "collision": 2,
-        "blindSpot": 3,
-        "laneDeparture": 4
-    }
-
     alert_id = ALERT_IDS.get(alert_type)
     if not alert_id:
-        print(f"[DB] Unknown alert type: {alert_type}")
+        log.warning("Unknown alert type: %s", alert_type)
         return get_all_alerts()
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE alerts SET status = ?, last_updated = CURRENT_TIMESTAMP WHERE id = ?",
-        (status, alert_id)
-    )
-    conn.commit()
+    with _pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE alerts SET status = ?, last_updated = CURRENT_TIMESTAMP WHERE id = ?",
+            (status, alert_id)
+        )
+        conn.commit()
     
-    # Verify the update worked
-    cursor.execute("SELECT status FROM alerts WHERE id = ?", (alert_id,))
-    result = cursor.fetchone()
-    conn.close()
+        # Verify the update worked (diagnostics only: costs an extra query)
+        if DIAGNOSTICS:
+            cursor.execute("SELECT status FROM alerts WHERE id = ?", (alert_id,))
+            result = cursor.fetchone()
+            log.info("Updated alert", extra={"fields": {
+                "type": alert_type, "status": status, "verified": result['status']}})
     
-    print(f"[DB] Updated {alert_type} → {status} (verified: {result['status']})")
     return get_all_alerts()
 
 
 def get_latest_speed():
     """Get the most recent speed record"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with _pool.connection() as conn:
+        cursor = conn.cursor()
     
-    cursor.execute("SELECT speed FROM speed_records ORDER BY timestamp DESC LIMIT 1")
-    result = cursor.fetchone()
-    
-    conn.close()
+        # id is monotonic, so the primary key finds the newest row directly
+        cursor.execute("SELECT speed FROM speed_records ORDER BY id DESC LIMIT 1")
+        result = cursor.fetchone()
     return result['speed'] if result else 0
 
-def record_speed(speed):
-    """Add a new speed record"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def _store_speeds(cursor, samples):
+    """
+    Insert (speed, ts) samples, fold them into the rollups and trim the raw
+    ring and expired rollup buckets. Runs inside the caller's transaction.
+    """
+    if not samples:
+        return
     
+    cursor.executemany(
+        "INSERT INTO speed_records (speed, ts) VALUES (?, ?)",
+        samples
+    )
+    
+    for resolution, retention in SPEED_ROLLUP_RETENTION.items():
+        buckets = {}
+        for speed, ts in samples:
+            bucket = int(ts // resolution) * resolution
+            agg = buckets.get(bucket)
+            if agg is None:
+                buckets[bucket] = [speed, speed, speed, 1]
+            else:
+                agg[0] = min(agg[0], speed)
+                agg[1] = max(agg[1], speed)
+                agg[2] += speed
+                agg[3] += 1
+        cursor.executemany('''
+            INSERT INTO speed_rollups (resolution, bucket, min_speed, max_speed, sum_speed, samples)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (resolution, bucket) DO UPDATE SET
+                min_speed = MIN(min_speed, excluded.min_speed),
+                max_speed = MAX(max_speed, excluded.max_speed),
+                sum_speed = sum_speed + excluded.sum_speed,
+                samples = samples + excluded.samples
+        ''', [(resolution, bucket, *agg) for bucket, agg in buckets.items()])
+        cursor.execute(
+            "DELETE FROM speed_rollups WHERE resolution = ? AND bucket < ?",
+            (resolution, samples[-1][1] - retention)
+        )
+    
+    # Keep only the newest SPEED_RAW_LIMIT raw rows (primary-key range delete)
     cursor.execute(
-        "INSERT INTO speed_records (speed) VALUES (?)",
-        (speed,)
+        "DELETE FROM speed_records WHERE id <= (SELECT MAX(id) FROM speed_records) - ?",
+        (SPEED_RAW_LIMIT,)
     )
+
+def record_speed(speed, ts=None):
+    """Add a new speed record"""
+    with _pool.connection() as conn:
+        cursor = conn.cursor()
+    
+        _store_speeds(cursor, [(speed, ts if ts is not None else time.time())])
     
-    conn.commit()
-    conn.close()
+        conn.commit()
     return speed
 
 def get_active_signs():
     """Get all active traffic signs"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with _pool.connection() as conn:
+        cursor = conn.cursor()
     
-    cursor.execute(
-        "SELECT id, type, value, distance FROM traffic_signs WHERE active = 1"
-    )
-    rows = cursor.fetchall()
-    
-    signs = []
-    for row in rows:
-        signs.append({
-            'id': row['id'],
-            'type': row['type'],
-            'value': row['value'],
-            'distance': row['distance']
-        })
-    
-    conn.close()
+        cursor.execute(
+            "SELECT id, type, value, distance FROM traffic_signs WHERE active = 1 ORDER BY id"
+        )
+        rows = cursor.fetchall()
+    
+        signs = []
+        for row in rows:
+            signs.append({
+                'id': row['id'],
+                'type': row['type'],
+                'value': row['value'],
+                'distance': row['distance']
+            })
     return signs
 
-def update_sign(sign_id, data):
-    """Update a traffic sign's information"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
+def _sign_update_query(sign_id, data):
+    """Build the UPDATE for the sign fields present in data (None if no fields)"""
     set_clauses = []
     params = []
     
@@ -195,30 +362,104 @@ def update_sign(sign_id, data):
         set_clauses.append("active = ?")
         params.append(data['active'])
     
-    params.append(sign_id)
+    if not set_clauses:
+        return None
     
-    if set_clauses:
-        query = f"UPDATE traffic_signs SET {', '.join(set_clauses)} WHERE id = ?"
-        cursor.execute(query, params)
-        conn.commit()
+    params.append(sign_id)
+    return f"UPDATE traffic_signs SET {', '.join(set_clauses)} WHERE id = ?", params
+
+def update_sign(sign_id, data):
+    """Update a traffic sign's information"""
+    with _pool.connection() as conn:
+        cursor = conn.cursor()
     
-    conn.close()
+        update = _sign_update_query(sign_id, data)
+        if update:
+            cursor.execute(*update)
+            conn.commit()
     return get_active_signs()
 
 def add_sign(sign_type, value, distance):
     """Add a new traffic sign"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with _pool.connection() as conn:
+        cursor = conn.cursor()
     
-    cursor.execute(
-        "INSERT INTO traffic_signs (type, value, distance, active) VALUES (?, ?, ?, 1)",
-        (sign_type, value, distance)
-    )
+        cursor.execute(
+            "INSERT INTO traffic_signs (type, value, distance, active) VALUES (?, ?, ?, 1)",
+            (sign_type, value, distance)
+        )
     
-    conn.commit()
-    conn.close()
+        conn.commit()
     return get_active_signs()
 
+def get_speed_history(start, end, resolution=1):
+    """
+    Speed min/max/avg per bucket between start and end (epoch seconds),
+    read from the rollup table for the given bucket width (1 or 60 s).
+    Ranges with more than SPEED_HISTORY_MAX_POINTS buckets return the newest
+    ones, oldest first.
+    """
+    with _pool.connection() as conn:
+        cursor = conn.cursor()
+    
+        cursor.execute('''
+            SELECT bucket, min_speed, max_speed, sum_speed / samples AS avg_speed, samples
+            FROM speed_rollups
+            WHERE resolution = ? AND bucket >= ? AND bucket <= ?
+            ORDER BY bucket DESC
+            LIMIT ?
+        ''', (resolution, int(start // resolution) * resolution, end, SPEED_HISTORY_MAX_POINTS))
+        rows = cursor.fetchall()
+    rows.reverse()
+    return [
+        {
+            't': row['bucket'],
+            'min': row['min_speed'],
+            'max': row['max_speed'],
+            'avg': row['avg_speed'],
+            'samples': row['samples']
+        }
+        for row in rows
+    ]
+
+def get_max_sign_id():
+    """Highest traffic sign ID ever used (0 if the table is empty)"""
+    with _pool.connection() as conn:
+        cursor = conn.cursor()
+    
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM traffic_signs")
+        result = cursor.fetchone()
+    return result[0]
+
+def persist_batch(alerts, speeds, signs):
+    """
+    Write a batch of buffered dashboard changes in one transaction.
+    alerts: {alert_type: status}, speeds: [(speed, ts), ...] in arrival order,
+    signs: {sign_id: fields}; fields with 'new' set are inserted with that ID.
+    """
+    with _pool.connection() as conn:
+        cursor = conn.cursor()
+    
+        cursor.executemany(
+            "UPDATE alerts SET status = ?, last_updated = CURRENT_TIMESTAMP WHERE id = ?",
+            [(status, ALERT_IDS[atype]) for atype, status in alerts.items() if atype in ALERT_IDS]
+        )
+    
+        _store_speeds(cursor, speeds)
+    
+        for sign_id, fields in signs.items():
+            if fields.get('new'):
+                cursor.execute(
+                    "INSERT INTO traffic_signs (id, type, value, distance, active) VALUES (?, ?, ?, ?, ?)",
+                    (sign_id, fields['type'], fields.get('value', ''), fields['distance'], fields.get('active', 1))
+                )
+            else:
+                update = _sign_update_query(sign_id, fields)
+                if update:
+                    cursor.execute(*update)
+    
+        conn.commit()
+
 def get_dashboard_state():
     """Get the complete dashboard state from the database,
     emitting alert IDs for frontend highlighting"""
@@ -246,22 +487,22 @@ def get_dashboard_state():
 
 def clear_database():
     """Clear all test data from database for testing purposes"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with _pool.connection() as conn:
+        cursor = conn.cursor()
     
-    cursor.execute("UPDATE alerts SET status = 0, last_updated = CURRENT_TIMESTAMP")
-    cursor.execute("UPDATE traffic_signs SET active = 0")
+        cursor.execute("UPDATE alerts SET status = 0, last_updated = CURRENT_TIMESTAMP")
+        cursor.execute("UPDATE traffic_signs SET active = 0")
     
-    default_speed_limit = ('speed_limit', '55', '50m')
-    cursor.execute(
-        "INSERT INTO traffic_signs (type, value, distance, active) VALUES (?, ?, ?, 1)",
-        default_speed_limit
-    )
+        default_speed_limit = ('speed_limit', '55', '50m')
+        cursor.execute(
+            "INSERT INTO traffic_signs (type, value, distance, active) VALUES (?, ?, ?, 1)",
+            default_speed_limit
+        )
     
-    cursor.execute("DELETE FROM speed_records")
-    cursor.execute("INSERT INTO speed_records (speed) VALUES (0)")
+        cursor.execute("DELETE FROM speed_records")
+        cursor.execute("DELETE FROM speed_rollups")
+        _store_speeds(cursor, [(0, time.time())])
     
-    conn.commit()
-    conn.close()
+        conn.commit()
     
     return get_dashboard_state()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark db.py request throughput: fresh connection per call (old behaviour)
+vs the pooled, WAL-tuned connections.
+
+Runs against a throwaway database so dashboard.db is never touched.
+Usage: python3 db_benchmark.py [requests]
+"""
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import db
+
+ALERT_TYPES = ["pedestrian", "collision", "blindSpot", "laneDeparture"]
+
+
+class FreshConnectionPerCall:
+    """Stand-in for the old get_db_connection(): connect, use, close"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def acquire(self):
+        conn = sqlite3.connect(str(self.db_path))
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def release(self, conn):
+        conn.close()
+
+    @contextmanager
+    def connection(self):
+        # Same interface as ConnectionPool.connection(); closing rolls back
+        # anything the caller didn't commit
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        pass
+
+
+def update_alert_request(i):
+    """Same DB calls a single /update_alert request makes in app.py"""
+    alert_type = ALERT_TYPES[i % len(ALERT_TYPES)]
+    db.get_all_alerts()
+    db.update_alert(alert_type, i % 2)
+    db.get_all_alerts()
+    db.get_dashboard_state()
+
+
+def update_speed_request(i):
+    """Same DB calls a single /update_speed request makes in app.py"""
+    db.record_speed(i % 80)
+    db.get_dashboard_state()
+
+
+def run(label, n_requests):
+    results = {}
+    for name, handler in (("update_alert", update_alert_request),
+                          ("update_speed", update_speed_request)):
+        start = time.perf_counter()
+        for i in range(n_requests):
+            handler(i)
+        elapsed = time.perf_counter() - start
+        results[name] = n_requests / elapsed
+        print(f"  {label:<8} /{name:<13} {results[name]:8.0f} req/s")
+    return results
+
+
+def main():
+    n_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Simulating {n_requests} requests per route\n")
+
+        # Before: new connection for every db.py call, default journal
+        legacy_path = Path(tmp) / "legacy.db"
+        db.configure_db(legacy_path)
+        db._pool = FreshConnectionPerCall(legacy_path)
+        db.init_db()
+        before = run("before", n_requests)
+
+        # After: pooled connections with WAL + tuned pragmas
+        db.configure_db(Path(tmp) / "pooled.db")
+        db.init_db()
+        after = run("pooled", n_requests)
+        db.close_db()
+
+    print()
+    for name in before:
+        print(f"  /{name:<13} speedup x{after[name] / before[name]:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Vectorized detection post-processing.
+
+Applies the per-detector false-positive rules (confidence threshold,
+minimum area, aspect-ratio limits, ROI mask) to a whole result's
+xyxy / conf / cls arrays with NumPy masks, instead of calling box_ok()
+per box. The rules are the same as box_ok(), including its integer box
+coordinates, so the accepted set doesn't change.
+
+The class -> detector type mapping (e.g. light vs sign for the merged
+model) is evaluated once per model into an integer lookup table, so the
+per-frame cost no longer depends on string scans of class names. A
+ClassMetadata (class_metadata.py) already carries that table.
+
+    det_filter = DetectionFilter(TH_CONF, MIN_AREA, ASPECT_LIMITS, ROI_MASK)
+    groups = det_filter.filter_result(res, "pedestrian")          # fixed type
+    groups = det_filter.filter_result(res, effective_type_for)    # per class
+    groups = det_filter.filter_result(res, meta)                  # ClassMetadata
+    # {(det_type, class index): [[x1, y1, x2, y2, conf], ...]}
+"""
+import numpy as np
+
+DET_TYPES = ("light", "sign", "pedestrian")
+TYPE_ID = {name: i for i, name in enumerate(DET_TYPES)}
+
+
+def to_numpy(values):
+    """Ultralytics tensors (or arrays) as NumPy"""
+    return values.cpu().numpy() if hasattr(values, "cpu") else np.asarray(values)
+
+
+class DetectionFilter:
+    def __init__(self, th_conf, min_area, aspect_limits, roi_mask=None):
+        # Per-type rule tables, indexed by type id
+        self.conf_th = np.array([th_conf.get(t, 1.1) for t in DET_TYPES], dtype=np.float64)
+        self.min_area = np.array([min_area.get(t, 0) for t in DET_TYPES], dtype=np.int64)
+        self.ratio_min = np.array([aspect_limits.get(t, (0, np.inf))[0] for t in DET_TYPES], dtype=np.float64)
+        self.ratio_max = np.array([aspect_limits.get(t, (0, np.inf))[1] for t in DET_TYPES], dtype=np.float64)
+        self.roi = None if roi_mask is None else roi_mask.astype(bool)
+        self._luts = {}
+
+    def type_lut(self, names, type_for):
+        """
+        int array: class index -> type id. `type_for` is a fixed type name,
+        a function of the class name, or a ClassMetadata. Built once per
+        (model names, type_for).
+        """
+        lut = getattr(type_for, "type_ids", None)
+        if lut is not None:
+            return lut
+        key = (id(names), type_for)
+        cached = self._luts.get(key)
+        if cached is not None and cached[0] is names:
+            return cached[1]
+        size = max(names) + 1 if names else 0
+        lut = np.empty(size, dtype=np.intp)
+        for idx in range(size):
+            det_type = type_for if isinstance(type_for, str) else type_for(names.get(idx, ""))
+            lut[idx] = TYPE_ID[det_type]
+        # Keep a reference to `names` so its id can't be reused while cached
+        self._luts[key] = (names, lut)
+        return lut
+
+    def mask(self, xyxy, conf, type_ids):
+        """Boolean keep-mask, same rules as box_ok()"""
+        b = xyxy.astype(np.int64)  # box_ok() truncates with int()
+        w = np.maximum(1, b[:, 2] - b[:, 0])
+        h = np.maximum(1, b[:, 3] - b[:, 1])
+        keep = conf >= self.conf_th[type_ids]
+        keep &= w * h >= self.min_area[type_ids]
+        ratio = h / w
+        keep &= (ratio >= self.ratio_min[type_ids]) & (ratio <= self.ratio_max[type_ids])
+        if self.roi is not None:
+            cx = (b[:, 0] + b[:, 2]) // 2
+            cy = (b[:, 1] + b[:, 3]) // 2
+            rows, cols = self.roi.shape
+            inside = (cx >= 0) & (cx < cols) & (cy >= 0) & (cy < rows)
+            keep &= inside
+            keep[inside] &= self.roi[cy[inside], cx[inside]]
+        return keep
+
+    def filter_arrays(self, names, xyxy, conf, cls, type_for):
+        """(kept xyxy, conf, class index, type id) arrays"""
+        cls = cls.astype(np.intp)
+        type_ids = self.type_lut(names, type_for)[cls]
+        keep = self.mask(xyxy, conf, type_ids)
+        return xyxy[keep], conf[keep], cls[keep], type_ids[keep]
+
+    def filter_result(self, res, type_for):
+        """Filtered boxes of an ultralytics result, grouped by (type, class index)"""
+        if res is None or res.boxes is None or len(res.boxes) == 0:
+            return {}
+        kept = self.filter_arrays(
+            res.names, to_numpy(res.boxes.xyxy), to_numpy(res.boxes.conf), to_numpy(res.boxes.cls), type_for)
+        return self.group(*kept)
+
+    @staticmethod
+    def group(xyxy, conf, cls, type_ids):
+        """{(type, class index): [[x1, y1, x2, y2, conf], ...]} for kept boxes"""
+        if len(cls) == 0:
+            return {}
+        rows = np.concatenate([xyxy, conf[:, None]], axis=1).tolist()
+        groups = {}
+        for row, c, t in zip(rows, cls.tolist(), type_ids.tolist()):
+            groups.setdefault((DET_TYPES[t], c), []).append(row)
+        return groups
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Per-detector ROI crops, shared by camera_test.py, Optimize1.py and
+quantize_models.py (INT8 calibration uses the same input layout).
+
+    preprocess = roi_preprocessors(IMGSZ, {name: detector_roi(name) for name in detectors})
+"""
+from frame_preprocess import roi_union
+
+# ROI cropping: each detector only gets its part of the frame (x0, y0, x1, y1
+# as frame fractions, None = whole frame) at the full-frame scale, so it runs
+# on fewer pixels. Crops start a bit above the top edge of the scripts'
+# ROI_MASK (lower 2/3 of the letterbox) so boxes centred in the mask aren't
+# cut off. Lights hang over the road, never in the bottom 30% (the road just
+# ahead); signs stand at the roadside and end above the bottom 15%.
+# Pedestrians stay uncropped: someone close to the car reaches the bottom of
+# the frame and a crop would cut their box short.
+ROI_CROP = {
+    "light": (0.0, 0.25, 1.0, 0.7),
+    "sign": (0.0, 0.25, 1.0, 0.85),
+    "pedestrian": None,
+}
+
+# Optimize1.py's merged light + sign model covers both crops
+MERGED_DETECTORS = {"merged": ("light", "sign")}
+
+
+def detector_roi(name):
+    """Crop for a detector in ROI_CROP or MERGED_DETECTORS (None = whole frame)"""
+    if name in MERGED_DETECTORS:
+        return roi_union(*(ROI_CROP[part] for part in MERGED_DETECTORS[name]))
+    return ROI_CROP[name]
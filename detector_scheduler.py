@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Priority-aware detector scheduling.
+
+Replaces the fixed `k % N` rotation. Each loop select() picks which
+detectors to run on the current frame:
+  1. detectors that are due (their minimum rate would be missed otherwise),
+     highest priority first; lower-priority due ones wait a frame if they
+     don't fit the budget, but never past twice their interval;
+  2. then, while the estimated step still fits the frame budget
+     (1000 / TARGET_FPS minus measured non-inference loop time), the
+     remaining detectors by priority.
+A detector that hasn't seen anything for idle_after_s drops to idle_hz and
+is only run when due again; the first detection restores its normal rate.
+
+Costs come from the measured per-model latency (InferenceEngine.timings),
+so the schedule adapts when models get slower or faster.
+
+    scheduler = DetectorScheduler({
+        "pedestrian": DetectorPolicy(priority=3, min_hz=8),
+        "sign": DetectorPolicy(priority=1, min_hz=2, idle_after_s=5, idle_hz=0.5),
+    }, target_fps=10, parallel=INFER_WORKERS)
+    names = scheduler.select()
+    results = engine.run(frame, names)
+    scheduler.record(engine.timings, loop_ms)
+    scheduler.observe("pedestrian", detected=True)
+"""
+import time
+from dataclasses import dataclass
+
+EMA_ALPHA = 0.2
+DEFAULT_COST_MS = 100.0  # assumed until a detector has been measured
+
+
+@dataclass
+class DetectorPolicy:
+    priority: int = 1          # higher runs first
+    min_hz: float = 1.0        # guaranteed rate while active
+    idle_after_s: float = None  # back off after this long with no detections (None = never)
+    idle_hz: float = None      # guaranteed rate while backed off
+
+
+class DetectorScheduler:
+    def __init__(self, policies, target_fps, parallel=1):
+        self.policies = dict(policies)
+        self.frame_budget_ms = 1000.0 / target_fps if target_fps else float("inf")
+        self.parallel = max(1, parallel)
+        start = time.monotonic()
+        self.last_run = {name: None for name in self.policies}
+        self.last_seen = {name: start for name in self.policies}
+        self.cost_ms = {}
+        self.overhead_ms = 0.0
+        self.runs = {name: 0 for name in self.policies}
+        self.deadline_misses = {name: 0 for name in self.policies}
+
+    # ---------- decisions ----------
+    def is_idle(self, name, now=None):
+        policy = self.policies[name]
+        if policy.idle_after_s is None or policy.idle_hz is None:
+            return False
+        now = time.monotonic() if now is None else now
+        return now - self.last_seen[name] > policy.idle_after_s
+
+    def interval_s(self, name, now=None):
+        policy = self.policies[name]
+        hz = policy.idle_hz if self.is_idle(name, now) else policy.min_hz
+        return 1.0 / hz if hz else float("inf")
+
+    def estimate_ms(self, names):
+        """Step cost when `names` run concurrently on `parallel` workers"""
+        costs = [self.cost_ms.get(name, DEFAULT_COST_MS) for name in names]
+        if not costs:
+            return 0.0
+        return max(max(costs), sum(costs) / min(self.parallel, len(costs)))
+
+    def select(self, now=None):
+        now = time.monotonic() if now is None else now
+        by_priority = sorted(self.policies, key=lambda n: -self.policies[n].priority)
+
+        # Due now if waiting for the next frame would overshoot the interval
+        frame_s = min(self.frame_budget_ms, 1000.0) / 1000.0
+        due = []
+        optional = []
+        for name in by_priority:
+            last = self.last_run[name]
+            if last is None or now - last + frame_s > self.interval_s(name, now):
+                due.append(name)
+            elif not self.is_idle(name, now):
+                optional.append(name)
+
+        # The most urgent due detector always runs; other due ones must fit
+        # the budget unless they've already waited twice their interval
+        chosen = []
+        budget = self.frame_budget_ms - self.overhead_ms
+        for name in due:
+            last = self.last_run[name]
+            starving = last is None or now - last >= 2 * self.interval_s(name, now)
+            if not chosen or starving or self.estimate_ms(chosen + [name]) <= budget:
+                chosen.append(name)
+        for name in optional:
+            if self.estimate_ms(chosen + [name]) <= budget:
+                chosen.append(name)
+
+        if not chosen and by_priority:
+            # Always do useful work: the detector closest to its deadline
+            chosen = [min(by_priority, key=lambda n: self.interval_s(n, now) - (now - self.last_run[n]))]
+
+        for name in chosen:
+            last = self.last_run[name]
+            if last is not None and now - last > self.interval_s(name, now) * 1.5:
+                self.deadline_misses[name] += 1
+            self.last_run[name] = now
+            self.runs[name] += 1
+        return chosen
+
+    # ---------- feedback ----------
+    def record(self, timings, loop_ms=None):
+        """Feed per-model ms (and the whole loop's ms) from the last step"""
+        for name, ms in timings.items():
+            if name in self.policies:
+                prev = self.cost_ms.get(name)
+                self.cost_ms[name] = ms if prev is None else prev + EMA_ALPHA * (ms - prev)
+        if loop_ms is not None and "total" in timings:
+            overhead = max(0.0, loop_ms - timings["total"])
+            self.overhead_ms += EMA_ALPHA * (overhead - self.overhead_ms)
+
+    def observe(self, name, detected, now=None):
+        if detected and name in self.last_seen:
+            self.last_seen[name] = time.monotonic() if now is None else now
+
+    def stats(self):
+        return {"runs": dict(self.runs), "deadline_misses": dict(self.deadline_misses),
+                "cost_ms": {k: round(v, 1) for k, v in self.cost_ms.items()},
+                "overhead_ms": round(self.overhead_ms, 1)}
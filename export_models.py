@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Export the detectors to ONNX / OpenVINO and check them against PyTorch.
+
+For every weights file and backend this
+  1. exports the model at the pipeline's IMGSZ (skip with --no-export),
+  2. runs the .pt and the exported model on the same frames and reports
+     parity: share of .pt detections matched (same class, IoU >= 0.5) by
+     the export, extra detections, and mean confidence difference,
+  3. reports per-frame latency (p50 / p90) for both.
+
+Usage:
+    python3 export_models.py --frames /home/sarsa/datasets/lisa/images/val
+    python3 export_models.py --backends onnx --frames "http://127.0.0.1:8090/?action=stream" --count 50
+Requires: pip install ultralytics onnx onnxruntime openvino
+"""
+import argparse
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from model_backends import BACKENDS, INT8_BACKENDS, exported_path, export, load_yolo
+
+DEFAULT_WEIGHTS = [
+    "/home/sarsa/Traffic_Lights_Signs_Merged.pt",
+    "/home/sarsa/pedestrian_detection.pt",
+    "/home/sarsa/Traffic_lights_detection.pt",
+    "/home/sarsa/new_traffic_signs.pt",
+]
+IMGSZ = 384          # must match camera_test.py / Optimize1.py
+CONF, IOU = 0.25, 0.45
+MATCH_IOU = 0.5
+WARMUP = 3
+
+
+def load_frames(source, count):
+    """Frames from an image directory, a video file or a stream URL"""
+    path = Path(source)
+    if path.is_dir():
+        files = sorted(p for p in path.iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+        return [cv2.imread(str(p)) for p in files[:count]]
+    cap = cv2.VideoCapture(source)
+    frames = []
+    while len(frames) < count:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def detections(model, frames):
+    """Per-frame (xyxy, conf, cls) arrays and per-frame latency in ms"""
+    for frame in frames[:WARMUP]:
+        model.predict(frame, device="cpu", imgsz=IMGSZ, conf=CONF, iou=IOU, verbose=False)
+    outputs, latencies = [], []
+    for frame in frames:
+        t0 = time.perf_counter()
+        res = model.predict(frame, device="cpu", imgsz=IMGSZ, conf=CONF, iou=IOU, verbose=False)[0]
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+        boxes = res.boxes
+        outputs.append((boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy().astype(int)))
+    return outputs, latencies
+
+
+def box_iou(a, b):
+    """IoU matrix between (N, 4) and (M, 4) xyxy arrays"""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+def parity(reference, candidate):
+    """(matched share of reference boxes, extra candidate boxes, mean |conf diff|)"""
+    total = matched = extra = 0
+    conf_diffs = []
+    for (rb, rc, rk), (cb, cc, ck) in zip(reference, candidate):
+        total += len(rb)
+        used = set()
+        if len(rb) and len(cb):
+            ious = box_iou(rb, cb)
+            ious[rk[:, None] != ck[None, :]] = 0.0
+            for i in np.argsort(-rc):
+                j = int(np.argmax(ious[i]))
+                if ious[i, j] >= MATCH_IOU and j not in used:
+                    used.add(j)
+                    matched += 1
+                    conf_diffs.append(abs(float(rc[i]) - float(cc[j])))
+                    ious[:, j] = 0.0
+        extra += len(cb) - len(used)
+    share = matched / total if total else 1.0
+    return share, extra, float(np.mean(conf_diffs)) if conf_diffs else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--weights", nargs="+", default=DEFAULT_WEIGHTS)
+    parser.add_argument("--backends", nargs="+", default=["onnx", "openvino"],
+                        choices=[b for b in BACKENDS if b != "pt" and b not in INT8_BACKENDS])
+    parser.add_argument("--frames", required=True, help="image directory, video file or stream URL")
+    parser.add_argument("--count", type=int, default=100, help="frames used for parity/latency")
+    parser.add_argument("--no-export", action="store_true", help="reuse existing exports")
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames, args.count)
+    if not frames:
+        raise SystemExit(f"No frames read from {args.frames}")
+    print(f"{len(frames)} frames from {args.frames}, imgsz {IMGSZ}\n")
+
+    print(f"{'model':34s} {'backend':9s} {'p50 ms':>7s} {'p90 ms':>7s} {'matched':>8s} {'extra':>6s} {'dconf':>6s}")
+    for weights in args.weights:
+        if not Path(weights).exists():
+            print(f"{Path(weights).name:34s} missing, skipped")
+            continue
+        reference, ref_ms = detections(load_yolo(weights, "pt"), frames)
+        print(f"{Path(weights).name:34s} {'pt':9s} {np.percentile(ref_ms, 50):7.1f} {np.percentile(ref_ms, 90):7.1f}")
+        for backend in args.backends:
+            if not args.no_export:
+                export(weights, backend, IMGSZ)
+            if not exported_path(weights, backend).exists():
+                print(f"{'':34s} {backend:9s} not exported")
+                continue
+            candidate, cand_ms = detections(load_yolo(weights, backend), frames)
+            share, extra, dconf = parity(reference, candidate)
+            print(f"{'':34s} {backend:9s} {np.percentile(cand_ms, 50):7.1f} {np.percentile(cand_ms, 90):7.1f} "
+                  f"{share * 100:7.1f}% {extra:6d} {dconf:6.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Letterbox preprocessing into reusable buffers, producing the model tensor.
+
+The detector scripts' former letterbox() allocated a new canvas and
+resized image per call, and ultralytics then letterboxed the (already
+square) image again, flipped BGR->RGB, transposed to CHW and scaled to
+0..1 - more copies per model per frame.
+
+LetterboxPreprocessor does it in one pass into buffers it owns:
+  - the frame is resized into a preallocated buffer (cv2.resize dst=),
+  - each channel is scaled by 1/255 straight into its place in a
+    preallocated float32 (1, 3, size, size) RGB canvas, whose padding is
+    filled once and never touched again.
+predict() then gets a ready BCHW tensor (torch.from_numpy, no copy), for
+which ultralytics skips its own letterbox and normalization. Boxes come
+back in the same size x size letterbox coordinates as before.
+
+Buffers are kept per input frame size, so a steady stream allocates
+nothing after the first frame. The returned tensor is overwritten by the
+next call - consume it before preprocessing the next frame (the
+InferenceEngine does: all models finish before run() returns).
+
+    prep = LetterboxPreprocessor(IMGSZ)
+    inp = prep(frame)                    # torch.Tensor (1, 3, IMGSZ, IMGSZ)
+
+ROI cropping: with roi=(x0, y0, x1, y1) (fractions of the frame) only that
+part of the frame is resized, at the same scale the full-frame letterbox
+would use, into a smaller canvas rounded up to the model stride - the
+model sees the same detail on fewer pixels (lower 3/4 of a 640x480 frame
+at IMGSZ 384: 384x224 instead of 384x384). restore(result) then moves the
+boxes back into the full-frame IMGSZ letterbox coordinates, so ROI_MASK,
+MIN_AREA and the rest of the pipeline don't change.
+
+ONNX / OpenVINO / INT8 exports are static (dynamic=False) and only accept
+size x size input. With square=True the crop is padded into the usual
+size x size canvas instead: the model sees the same pixels of the crop
+and nothing outside it, only the smaller canvas is given up.
+
+    prep = LetterboxPreprocessor(IMGSZ, roi=(0.0, 0.25, 1.0, 1.0),
+                                 square=static_input(MODEL_BACKEND))
+    result = yolo_predict(model, prep(frame))
+    prep.restore(result)
+"""
+import math
+
+import cv2
+import numpy as np
+
+SCALE = np.float32(1.0 / 255.0)
+STRIDE = 32  # YOLO input sides must be multiples of the model stride
+
+
+def roi_preprocessors(size, rois, **kwargs):
+    """{detector: LetterboxPreprocessor} with one shared preprocessor per distinct ROI"""
+    shared = {}
+    for roi in set(rois.values()):
+        shared[roi] = LetterboxPreprocessor(size, roi=roi, **kwargs)
+    return {name: shared[roi] for name, roi in rois.items()}
+
+
+def roi_union(*rois):
+    """Smallest ROI covering all of `rois` (None = whole frame)"""
+    if any(roi is None for roi in rois):
+        return None
+    return (min(r[0] for r in rois), min(r[1] for r in rois),
+            max(r[2] for r in rois), max(r[3] for r in rois))
+
+
+class LetterboxPreprocessor:
+    def __init__(self, size, pad_value=0, as_tensor=True, roi=None, stride=STRIDE, square=False):
+        self.size = size
+        self.roi = None if roi is None or tuple(roi) == (0, 0, 1, 1) else tuple(roi)
+        self.stride = stride
+        self.square = square  # keep a size x size canvas for static-shape models
+        self.pad = pad_value / 255.0
+        self.as_tensor = as_tensor
+        self._torch = None
+        if as_tensor:
+            import torch
+            self._torch = torch
+        # (h, w) -> (resized buffer, canvas, tensor, (top, left, nh, nw), crop slices, box map)
+        self._layouts = {}
+        self._box_map = (1.0, 0.0, 1.0, 0.0)
+
+    def _layout(self, h, w):
+        layout = self._layouts.get((h, w))
+        if layout is None:
+            size = self.size
+            r = min(size / h, size / w)
+            full_nh, full_nw = int(h * r), int(w * r)
+            out_h = out_w = size
+            if self.roi is None:
+                cx0, cy0, cw, ch = 0, 0, w, h
+            else:
+                x0, y0, x1, y1 = self.roi
+                cx0, cy0 = int(x0 * w), int(y0 * h)
+                cw, ch = round(x1 * w) - cx0, round(y1 * h) - cy0
+                if not self.square:
+                    out_w = min(size, math.ceil(int(cw * r) / self.stride) * self.stride)
+                    out_h = min(size, math.ceil(int(ch * r) / self.stride) * self.stride)
+            nh, nw = int(ch * r), int(cw * r)
+            top, left = (out_h - nh) // 2, (out_w - nw) // 2
+            resized = np.empty((nh, nw, 3), dtype=np.uint8)
+            canvas = np.full((1, 3, out_h, out_w), self.pad, dtype=np.float32)
+            tensor = self._torch.from_numpy(canvas) if self.as_tensor else canvas
+            crop = (slice(cy0, cy0 + ch), slice(cx0, cx0 + cw))
+
+            # model input -> frame pixels -> full-frame letterbox, per axis
+            sx_in, sy_in = nw / cw, nh / ch
+            sx_full, sy_full = full_nw / w, full_nh / h
+            box_map = (sx_full / sx_in, (cx0 - left / sx_in) * sx_full + (size - full_nw) // 2,
+                       sy_full / sy_in, (cy0 - top / sy_in) * sy_full + (size - full_nh) // 2)
+            layout = (resized, canvas, tensor, (top, left, nh, nw), crop, box_map)
+            self._layouts[(h, w)] = layout
+        return layout
+
+    def __call__(self, img):
+        """BGR uint8 frame -> RGB float32 (1, 3, H, W) in 0..1 (H = W = size without a roi or with square)"""
+        h, w = img.shape[:2]
+        resized, canvas, tensor, (top, left, nh, nw), crop, self._box_map = self._layout(h, w)
+        if self.roi is not None:
+            img = img[crop]
+        if (nh, nw) == img.shape[:2]:
+            resized = img
+        else:
+            cv2.resize(img, (nw, nh), dst=resized, interpolation=cv2.INTER_LINEAR)
+        region = canvas[0, :, top:top + nh, left:left + nw]
+        for c in range(3):
+            # BGR -> RGB, HWC -> CHW and 0..255 -> 0..1 in one write
+            np.multiply(resized[:, :, 2 - c], SCALE, out=region[c], dtype=np.float32)
+        return tensor
+
+    def restore(self, result):
+        """Move a result's boxes from this crop's input into full-frame letterbox coordinates (in place)"""
+        if self.roi is None or result is None or result.boxes is None or len(result.boxes) == 0:
+            return result
+        sx, ox, sy, oy = self._box_map
+        data = result.boxes.data
+        for col, s, o in ((0, sx, ox), (1, sy, oy), (2, sx, ox), (3, sy, oy)):
+            data[:, col] *= s
+            data[:, col] += o
+        return result
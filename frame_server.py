@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Shared-memory frame server: capture and decode each camera once, let every
+perception process read the same frames without copying.
+
+The server owns the camera (an mjpg_streamer URL, a V4L2 index or a
+Picamera2 device), decodes every frame straight into one slot of a ring of
+NumPy buffers in multiprocessing.shared_memory, and publishes it with a
+sequence number and capture timestamp. Readers attach by name and get a
+read-only NumPy view of the newest slot.
+
+A slot is only rewritten after the writer has gone around the whole ring,
+so a reader has (RING_SLOTS - 1) frame periods to finish with a view.
+Readers that hold frames longer must check still_valid(seq) afterwards and
+discard what they computed from a reused slot, or copy the frame. The
+detector loops copy it (preprocessing) and check right after, so the ring
+only has to cover preprocessing; SharedFrameGrabber.slots_for(hold_s) gives
+the --slots a reader needs to hold frames for hold_s at the measured rate.
+
+Usage:
+    python3 frame_server.py --name front --source "http://127.0.0.1:8090/?action=stream"
+    python3 frame_server.py --name right --source picamera2:0
+Readers:
+    grab = SharedFrameGrabber("front")     # same read()/release() as FrameGrabber
+    seq, ts, frame = grab.read_latest()
+    seq, ts, frame = grab.read_new(seq, timeout=1.0)   # blocks for the next one
+"""
+import argparse
+import math
+import signal
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+RING_SLOTS = 4
+SHM_PREFIX = "adas_frames_"
+READER_STALE_S = 2.0   # reattach when the server stops publishing this long
+READER_POLL_S = 0.002  # read_new() poll interval (shared memory has no wakeup)
+
+# Header words (int64)
+H_MAGIC, H_SLOTS, H_HEIGHT, H_WIDTH, H_CHANNELS, H_LATEST, H_DROPPED = range(7)
+HEADER_WORDS = 8
+MAGIC = 0x4144415346524D31  # "ADASFRM1"
+
+
+def slots_for(hold_s, fps):
+    """Ring depth that keeps every frame intact for hold_s at fps (one slot is always being written)"""
+    return max(2, math.ceil(hold_s * fps) + 1)
+
+
+def _layout(slots, shape):
+    frame_bytes = int(np.prod(shape))
+    header_bytes = HEADER_WORDS * 8
+    meta_bytes = slots * 16  # per slot: int64 seq + float64 timestamp
+    return header_bytes, meta_bytes, frame_bytes, header_bytes + meta_bytes + slots * frame_bytes
+
+
+class FrameRing:
+    """Ring of fixed-size uint8 frames plus per-slot seq/timestamp in shared memory"""
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        self.header = np.ndarray((HEADER_WORDS,), dtype=np.int64, buffer=shm.buf)
+        if self.header[H_MAGIC] != MAGIC:
+            raise RuntimeError(f"{shm.name} is not a frame ring")
+        self.slots = int(self.header[H_SLOTS])
+        self.shape = tuple(int(v) for v in self.header[H_HEIGHT:H_CHANNELS + 1] if v > 0)
+        header_bytes, meta_bytes, frame_bytes, _ = _layout(self.slots, self.shape)
+        self.seqs = np.ndarray((self.slots,), dtype=np.int64, buffer=shm.buf, offset=header_bytes)
+        self.stamps = np.ndarray((self.slots,), dtype=np.float64, buffer=shm.buf,
+                                 offset=header_bytes + self.slots * 8)
+        self.frames = [
+            np.ndarray(self.shape, dtype=np.uint8, buffer=shm.buf,
+                       offset=header_bytes + meta_bytes + i * frame_bytes)
+            for i in range(self.slots)
+        ]
+        if not owner:
+            for frame in self.frames:
+                frame.flags.writeable = False
+
+    @classmethod
+    def create(cls, name, shape, slots=RING_SLOTS):
+        shape = tuple(shape)
+        _, _, _, total = _layout(slots, shape)
+        try:
+            # Left behind by a server that didn't shut down cleanly
+            stale = shared_memory.SharedMemory(name=SHM_PREFIX + name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        shm = shared_memory.SharedMemory(name=SHM_PREFIX + name, create=True, size=total)
+        header = np.ndarray((HEADER_WORDS,), dtype=np.int64, buffer=shm.buf)
+        header[:] = 0
+        header[H_SLOTS] = slots
+        header[H_HEIGHT:H_HEIGHT + len(shape)] = shape
+        header[H_LATEST] = -1
+        header[H_MAGIC] = MAGIC  # last, so readers never see a half-built header
+        ring = cls(shm, owner=True)
+        ring.seqs[:] = -1
+        return ring
+
+    @classmethod
+    def attach(cls, name):
+        """Map an existing ring read-only; meant for processes other than the server"""
+        try:
+            shm = shared_memory.SharedMemory(name=SHM_PREFIX + name, track=False)
+        except TypeError:
+            # Python < 3.13 registers attached segments with the resource
+            # tracker, which would unlink the server's ring when a reader exits
+            shm = shared_memory.SharedMemory(name=SHM_PREFIX + name)
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm, owner=False)
+
+    # ---------- writer ----------
+    def begin_write(self):
+        """Return (seq, slot buffer) for the next frame; the slot is invalid until commit()"""
+        seq = int(self.header[H_LATEST]) + 1
+        slot = seq % self.slots
+        self.seqs[slot] = -1
+        return seq, self.frames[slot]
+
+    def commit(self, seq, timestamp):
+        slot = seq % self.slots
+        self.stamps[slot] = timestamp
+        self.seqs[slot] = seq
+        self.header[H_LATEST] = seq
+
+    def count_dropped(self):
+        self.header[H_DROPPED] += 1
+
+    # ---------- reader ----------
+    def latest(self):
+        """(seq, timestamp, read-only view) of the newest frame, or None"""
+        seq = int(self.header[H_LATEST])
+        if seq < 0:
+            return None
+        slot = seq % self.slots
+        timestamp = float(self.stamps[slot])
+        if int(self.seqs[slot]) != seq:
+            return None  # being overwritten right now
+        return seq, timestamp, self.frames[slot]
+
+    def still_valid(self, seq):
+        """True if the slot that held `seq` hasn't been reused since"""
+        return int(self.seqs[seq % self.slots]) == seq
+
+    def close(self):
+        # Views must go before the mapping can be released
+        self.header = self.seqs = self.stamps = None
+        self.frames = []
+        if self.owner:
+            self.shm.unlink()
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # a caller still holds a frame; the mapping goes when it does
+
+
+# =========================
+# Capture sources
+# =========================
+class OpenCvSource:
+    """mjpg_streamer URL, video file or V4L2 index via cv2.VideoCapture"""
+
+    def __init__(self, src):
+        import cv2
+        self.cv2 = cv2
+        if isinstance(src, str) and src.isdigit():
+            src = int(src)
+        self.cap = cv2.VideoCapture(src, cv2.CAP_FFMPEG) if isinstance(src, str) else cv2.VideoCapture(src)
+        try:
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        except Exception:
+            pass
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Failed to open {src}")
+
+    def read(self, out=None):
+        """Decode the next frame, into `out` when its shape matches"""
+        ok, frame = self.cap.read(out) if out is not None else self.cap.read()
+        if not ok or frame is None:
+            return None
+        if frame.ndim == 2:
+            frame = self.cv2.cvtColor(frame, self.cv2.COLOR_GRAY2BGR)
+        return frame
+
+    def release(self):
+        self.cap.release()
+
+
+class Picamera2Source:
+    """CSI camera via Picamera2 (same 640x480 preview config as lane_assist_dashboard.py)"""
+
+    def __init__(self, index, size=(640, 480)):
+        from picamera2 import Picamera2
+        self.cam = Picamera2(index)
+        self.cam.configure(self.cam.create_preview_configuration(main={"size": size}))
+        self.cam.start()
+
+    def read(self, out=None):
+        return self.cam.capture_array()
+
+    def release(self):
+        self.cam.stop()
+
+
+def open_source(spec):
+    if spec.startswith("picamera2:"):
+        return Picamera2Source(int(spec.split(":", 1)[1]))
+    return OpenCvSource(spec)
+
+
+# =========================
+# Server
+# =========================
+class FrameServer:
+    def __init__(self, name, source, slots=RING_SLOTS):
+        self.name = name
+        self.source = source
+        self.slots = slots
+        self.ring = None
+        self.running = False
+        self.frames = 0
+
+    def run(self):
+        self.running = True
+        frame = None
+        while self.running:
+            frame = self.source.read()
+            if frame is not None:
+                break
+            time.sleep(0.005)  # camera not delivering yet
+        if frame is None:
+            return
+        # The first frame fixes the ring geometry
+        self.ring = FrameRing.create(self.name, frame.shape, self.slots)
+        seq, slot = self.ring.begin_write()
+        np.copyto(slot, frame)
+        self.ring.commit(seq, time.time())
+        self.frames = 1
+
+        try:
+            while self.running:
+                seq, slot = self.ring.begin_write()
+                frame = self.source.read(slot)
+                timestamp = time.time()
+                if frame is None:
+                    self.ring.count_dropped()
+                    time.sleep(0.005)
+                    continue
+                if frame.__array_interface__["data"][0] != slot.__array_interface__["data"][0]:
+                    # The source couldn't decode in place (e.g. Picamera2)
+                    if frame.shape != slot.shape:
+                        self.ring.count_dropped()
+                        continue
+                    np.copyto(slot, frame)
+                self.ring.commit(seq, timestamp)
+                self.frames += 1
+        finally:
+            self.ring.close()
+
+    def stop(self):
+        self.running = False
+
+
+# =========================
+# Reader (drop-in for camera_test.FrameGrabber)
+# =========================
+class SharedFrameGrabber:
+    def __init__(self, name, wait_s=5.0):
+        self.name = name
+        self.ring = None
+        self.last_seq = -1
+        self.attaches = 0
+        self._last_new = time.monotonic()
+        deadline = time.monotonic() + wait_s
+        while not self._attach():
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"No frame server named '{name}' (start frame_server.py --name {name})")
+            time.sleep(0.1)
+
+    def _attach(self):
+        try:
+            self.ring = FrameRing.attach(self.name)
+        except (FileNotFoundError, RuntimeError):
+            self.ring = None
+            return False
+        self.attaches += 1
+        self._last_new = time.monotonic()
+        return True
+
+    def read_latest(self):
+        """(seq, capture timestamp, read-only frame) or None"""
+        if self.ring is None and not self._attach():
+            return None
+        latest = self.ring.latest()
+        if latest is None or latest[0] == self.last_seq:
+            if time.monotonic() - self._last_new > READER_STALE_S:
+                # Server restarted (new segment) or died; try to pick it up again
+                self.ring.close()
+                self._attach()
+                return None
+            return latest
+        self.last_seq = latest[0]
+        self._last_new = time.monotonic()
+        return latest
+
+    def read_new(self, after_seq, timeout=None):
+        """
+        Wait for a frame newer than after_seq: (seq, timestamp, frame), or None
+        on timeout. After the server restarts (seq starts over) any frame counts.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        attaches = self.attaches
+        while True:
+            latest = self.read_latest()
+            if latest is not None and (latest[0] > after_seq or self.attaches != attaches):
+                return latest
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(READER_POLL_S)
+
+    def read(self):
+        latest = self.read_latest()
+        return latest[2] if latest else None
+
+    def still_valid(self, seq):
+        return self.ring is not None and self.ring.still_valid(seq)
+
+    def fps(self):
+        """Capture rate from the timestamps in the ring (0.0 until it holds two frames)"""
+        if self.ring is None:
+            return 0.0
+        frames = sorted((int(seq), float(ts)) for seq, ts in zip(self.ring.seqs, self.ring.stamps) if seq >= 0)
+        if len(frames) < 2 or frames[-1][1] <= frames[0][1]:
+            return 0.0
+        return (frames[-1][0] - frames[0][0]) / (frames[-1][1] - frames[0][1])
+
+    def hold_s(self):
+        """How long a frame stays intact after capture: (slots - 1) frame periods"""
+        fps = self.fps()
+        return (self.ring.slots - 1) / fps if fps else float("inf")
+
+    def slots_for(self, hold_s):
+        """--slots the server needs for readers to hold frames for hold_s"""
+        return slots_for(hold_s, self.fps())
+
+    def release(self):
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--name", required=True, help="ring name readers attach to, e.g. front")
+    parser.add_argument("--source", required=True, help="stream URL, V4L2 index or picamera2:<n>")
+    parser.add_argument("--slots", type=int, default=RING_SLOTS,
+                        help="ring depth; readers get (slots - 1) frame periods per frame")
+    args = parser.parse_args()
+
+    server = FrameServer(args.name, open_source(args.source), args.slots)
+    signal.signal(signal.SIGTERM, lambda *_: server.stop())
+
+    def report():
+        last = 0
+        while server.running:
+            time.sleep(5.0)
+            print(f"[frame_server:{args.name}] {(server.frames - last) / 5.0:.1f} fps, {server.frames} frames")
+            last = server.frames
+
+    threading.Thread(target=report, daemon=True).start()
+    print(f"[frame_server:{args.name}] serving {args.source}")
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.source.release()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Consumer-side frame freshness metrics.
+
+Every grabber (FrameGrabber, MjpegGrabber, SharedFrameGrabber) hands out
+frames as (seq, capture timestamp, frame): seq increases by one per
+captured frame, the timestamp is time.time() when the frame arrived. Fed
+the frames the loop actually processed, FrameStats reports
+
+  - dropped: captured frames the loop never saw (gaps in seq),
+  - latency: capture -> end of inference, p50 / p90 over recent frames.
+
+    stats = FrameStats()
+    seq, ts, frame = grab.read_new(last_seq, timeout=1.0)
+    ...inference...
+    stats.update(seq, ts)
+    print(stats.summary())   # "drop 61% | lat p50 84ms p90 97ms"
+"""
+import time
+from collections import deque
+
+WINDOW = 200  # recent frames for the latency percentiles
+
+
+class FrameStats:
+    def __init__(self, window=WINDOW):
+        self.latencies_ms = deque(maxlen=window)
+        self.last_seq = None
+        self.processed = 0
+        self.dropped = 0
+
+    def update(self, seq, timestamp, now=None):
+        now = time.time() if now is None else now
+        if self.last_seq is not None and seq > self.last_seq + 1:
+            self.dropped += seq - self.last_seq - 1
+        self.last_seq = seq
+        self.processed += 1
+        self.latencies_ms.append((now - timestamp) * 1000.0)
+
+    def percentile(self, q):
+        if not self.latencies_ms:
+            return 0.0
+        ordered = sorted(self.latencies_ms)
+        return ordered[min(len(ordered) - 1, int(q / 100.0 * len(ordered)))]
+
+    def stats(self):
+        seen = self.processed + self.dropped
+        return {
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "drop_rate": self.dropped / seen if seen else 0.0,
+            "latency_p50_ms": self.percentile(50),
+            "latency_p90_ms": self.percentile(90),
+        }
+
+    def summary(self):
+        s = self.stats()
+        return (f"drop {s['drop_rate'] * 100:.0f}% | "
+                f"lat p50 {s['latency_p50_ms']:.0f}ms p90 {s['latency_p90_ms']:.0f}ms")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+End-to-end alert latency by transport.
+
+Toggles a safety alert through each producer transport and times, from the
+send call to the dashboard's state_patch carrying the change:
+    http        requests.post per alert, new connection each time (the old producer helpers)
+    http-keep   POST /ingest over one keep-alive requests.Session
+    ipc         datagram on the local IPC bus (ipc_bus.py)
+
+Run against a backend on this machine (python3 serve.py).
+Usage: python3 ipc_benchmark.py [--count 200] [--alert pedestrian]
+Requires: pip install "python-socketio[client]" requests
+"""
+import argparse
+import threading
+import time
+
+import requests
+import socketio
+
+from ipc_bus import IpcPublisher, SOCKET_PATH
+
+BASE_URL = "http://localhost:8080"
+# Same IDs as the backend's activeAlerts entries
+ALERT_IDS = {"pedestrian": 1, "collision": 2, "blindSpot": 3, "laneDeparture": 4}
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=BASE_URL)
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    parser.add_argument("--count", type=int, default=200, help="alert toggles per transport")
+    parser.add_argument("--alert", default="pedestrian", choices=sorted(ALERT_IDS),
+                        help="a safety alert, so broadcasts skip the frame budget")
+    args = parser.parse_args()
+
+    alert_id = ALERT_IDS[args.alert]
+    expected = {"active": None}
+    arrived = threading.Event()
+
+    def on_patch(patch):
+        alerts = patch.get("changes", {}).get("activeAlerts")
+        if alerts is not None and any(a["id"] == alert_id for a in alerts) == expected["active"]:
+            arrived.set()
+
+    client = socketio.Client(reconnection=False)
+    client.on("state_patch", on_patch)
+    client.connect(args.url, transports=["websocket"], wait_timeout=5)
+
+    session = requests.Session()
+    ipc = IpcPublisher(args.socket)
+    if not ipc.available():
+        print(f"No IPC bus at {args.socket}; the ipc transport will fail")
+
+    def send_http(status):
+        requests.post(f"{args.url}/update_alert", json={"type": args.alert, "status": status}, timeout=2)
+
+    def send_http_keepalive(status):
+        session.post(f"{args.url}/ingest", json=[{"event": "alert", "type": args.alert, "status": status}], timeout=2)
+
+    def send_ipc(status):
+        if not ipc.publish([{"event": "alert", "type": args.alert, "status": status}]):
+            raise OSError("IPC publish failed")
+
+    transports = [("http", send_http), ("http-keep", send_http_keepalive), ("ipc", send_ipc)]
+
+    # Start from a known state
+    send_http(0)
+    time.sleep(0.5)
+    status = 0
+    for name, send in transports:
+        latencies = []
+        missed = 0
+        for _ in range(args.count):
+            status ^= 1
+            expected["active"] = bool(status)
+            arrived.clear()
+            t0 = time.perf_counter()
+            try:
+                send(status)
+            except (OSError, requests.RequestException):
+                missed += 1
+                status ^= 1
+                continue
+            if arrived.wait(2.0):
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+            else:
+                missed += 1
+        print(f"{name:10s} p50={percentile(latencies, 50):6.2f} ms  p99={percentile(latencies, 99):6.2f} ms  "
+              f"max={max(latencies, default=float('nan')):6.2f} ms  ({len(latencies)} ok, {missed} missed)")
+
+    send_http(0)
+    client.disconnect()
+    ipc.close()
+
+
+if __name__ == "__main__":
+    main()
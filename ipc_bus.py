@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Local IPC bus between the sensor processes and the dashboard backend.
+
+The camera, lane and ultrasonic scripts run on the same Pi as app.py, so
+they don't need TCP + HTTP + Flask dispatch for every alert. The backend
+binds a Unix domain datagram socket; each datagram is one JSON list of
+/ingest events and is applied exactly like a POST /ingest body.
+
+Datagrams keep message boundaries (no framing) and never block the sender:
+if the backend isn't listening or its socket buffer is full, publish()
+returns False and dashboard_client falls back to HTTP.
+
+Settings (environment variables):
+    ADAS_IPC_SOCKET   socket path (default /tmp/adas_dashboard.sock)
+"""
+import json
+import os
+import socket
+import threading
+
+from app_logging import get_logger
+
+log = get_logger("ipc")
+
+SOCKET_PATH = os.environ.get("ADAS_IPC_SOCKET", "/tmp/adas_dashboard.sock")
+MAX_DATAGRAM = 64 * 1024  # /ingest batches from the producers are a few hundred bytes
+
+
+class IpcPublisher:
+    """Producer side: fire-and-forget datagrams to the backend"""
+
+    def __init__(self, path=SOCKET_PATH):
+        self.path = path
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+
+    def available(self):
+        return os.path.exists(self.path)
+
+    def publish(self, events):
+        """Send a list of events; False means use the HTTP fallback"""
+        payload = json.dumps(events, separators=(",", ":")).encode("utf-8")
+        if len(payload) > MAX_DATAGRAM:
+            return False
+        try:
+            self.sock.sendto(payload, self.path)
+            return True
+        except OSError:
+            # No listener (ENOENT/ECONNREFUSED) or receive buffer full (EAGAIN)
+            return False
+
+    def close(self):
+        self.sock.close()
+
+
+def socket_in_use(path):
+    """True if a process is bound to the datagram socket at path (connecting sends nothing)"""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        probe.connect(path)
+        return True
+    except (ConnectionRefusedError, FileNotFoundError):
+        return False
+    finally:
+        probe.close()
+
+
+class IpcSubscriber:
+    """
+    Backend side: receive event batches and hand them to on_events(events).
+    Runs on a daemon thread (a green thread under serve.py's monkey patching).
+    """
+
+    def __init__(self, on_events, path=SOCKET_PATH):
+        self.on_events = on_events
+        self.path = path
+        self.sock = None
+        self.received = 0
+        self.errors = 0
+        self._thread = None
+        self._running = False
+        self._inode = None
+
+    def start(self):
+        """Bind the socket; RuntimeError if another live backend already owns it"""
+        if self._thread:
+            return
+        if os.path.exists(self.path):
+            if socket_in_use(self.path):
+                raise RuntimeError(f"IPC socket {self.path} is in use by another process")
+            # A previous backend that crashed leaves its socket file behind
+            os.unlink(self.path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(self.path)
+        self._inode = os.stat(self.path).st_ino
+        self.sock.settimeout(0.5)
+        self._running = True
+        self._thread = threading.Thread(target=self._recv_loop, daemon=True)
+        self._thread.start()
+        log.info("IPC bus listening", extra={"fields": {"path": self.path}})
+
+    def stop(self):
+        if not self._thread:
+            return
+        self._running = False
+        self._thread.join(timeout=2)
+        self._thread = None
+        self.sock.close()
+        try:
+            # Only remove the socket file if it is still the one we bound
+            if os.stat(self.path).st_ino == self._inode:
+                os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def stats(self):
+        return {"path": self.path, "received": self.received, "errors": self.errors}
+
+    def _recv_loop(self):
+        while self._running:
+            try:
+                payload = self.sock.recv(MAX_DATAGRAM)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            try:
+                events = json.loads(payload)
+            except ValueError:
+                self.errors += 1
+                log.warning("Dropped invalid IPC datagram", extra={"fields": {"bytes": len(payload)}})
+                continue
+            if not isinstance(events, list):
+                events = [events]
+            self.received += 1
+            try:
+                self.on_events(events)
+            except Exception:
+                self.errors += 1
+                log.exception("IPC batch failed")
@@ -1,7 +1,7 @@
 import cv2
 import numpy as np
 from picamera2 import Picamera2
-import requests
+from frame_server import SharedFrameGrabber
 import gpiod
 import time
 
@@ -55,30 +55,41 @@ def move_steering_right(pulse_width_ms, duration_s):
 # -----------------------------
 # API Configuration
 # -----------------------------
-BASE_URL = "http://localhost:8080"
+from dashboard_client import update_alert_via_api
 
 def update_lane_departure_via_api(detected):
-    """Update laneDeparture alert via Flask API."""
-    try:
-        requests.post(
-            f"{BASE_URL}/update_alert",
-            json={"type": "laneDeparture", "status": 1 if detected else 0},
-            timeout=1
-        )
-    except Exception:
-        pass  # Silent fail
+    """Update laneDeparture alert via the shared dashboard client (non-blocking)."""
+    update_alert_via_api("laneDeparture", detected)
 
 # -----------------------------
 # Camera setup
 # -----------------------------
-camera1 = Picamera2(0)  # Right side
-camera2 = Picamera2(1)  # Left side
-
-camera1.configure(camera1.create_preview_configuration(main={"size": (640, 480)}))
-camera2.configure(camera2.create_preview_configuration(main={"size": (640, 480)}))
-
-camera1.start()
-camera2.start()
+# Set to the frame_server.py ring names, e.g. ("right", "left"), when a frame
+# server owns the cameras so other processes can share the same frames
+FRAME_SERVERS = None
+
+if FRAME_SERVERS:
+    grab1 = SharedFrameGrabber(FRAME_SERVERS[0])  # Right side
+    grab2 = SharedFrameGrabber(FRAME_SERVERS[1])  # Left side
+else:
+    camera1 = Picamera2(0)  # Right side
+    camera2 = Picamera2(1)  # Left side
+
+    camera1.configure(camera1.create_preview_configuration(main={"size": (640, 480)}))
+    camera2.configure(camera2.create_preview_configuration(main={"size": (640, 480)}))
+
+    camera1.start()
+    camera2.start()
+
+def capture_frames():
+    """Right and left frames; shared frames are read-only views"""
+    if FRAME_SERVERS:
+        frame1, frame2 = grab1.read(), grab2.read()
+        while frame1 is None or frame2 is None:
+            time.sleep(0.005)
+            frame1, frame2 = grab1.read(), grab2.read()
+        return frame1, frame2
+    return camera1.capture_array(), camera2.capture_array()
 
 # -----------------------------
 # Preprocessing and detection
@@ -115,8 +126,7 @@ lane_correction_trigger = False
 # -----------------------------
 try:
     while True:
-        frame1 = camera1.capture_array()
-        frame2 = camera2.capture_array()
+        frame1, frame2 = capture_frames()
         frame2_processed = preprocess_for_ov5647(frame2)
 
         detected = detect_vertical_lines(frame1) or detect_vertical_lines(frame2_processed)
@@ -156,6 +166,9 @@ try:
             lane_logged = False
 
         # Display frames with simple 0/1 overlay
+        if FRAME_SERVERS:
+            # Don't draw into the shared ring
+            frame1, frame2 = frame1.copy(), frame2.copy()
         text = f"Lane Detected: {int(detected)}"
         cv2.putText(frame1, text, (20, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
         cv2.putText(frame2, text, (20, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
@@ -171,5 +184,9 @@ except KeyboardInterrupt:
 finally:
     update_lane_departure_via_api(False)
     cv2.destroyAllWindows()
-    camera1.stop()
-    camera2.stop()
+    if FRAME_SERVERS:
+        grab1.release()
+        grab2.release()
+    else:
+        camera1.stop()
+        camera2.stop()
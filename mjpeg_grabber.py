@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+MJPEG stream grabber that only decodes the frames that get used.
+
+cv2.VideoCapture(STREAM_URL, CAP_FFMPEG) decodes every JPEG mjpg_streamer
+sends (30 fps at 640x480) although the detector loop reads ~10 fps. This
+grabber reads the multipart/x-mixed-replace stream itself: its thread only
+splits parts and keeps the newest JPEG's bytes. read() decodes that JPEG
+on demand, so frames that were replaced before anyone read them are never
+decoded.
+
+Decoding uses OpenCV's libjpeg-turbo with DCT-domain downscaling
+(IMREAD_REDUCED_COLOR_2/4/8) when the stream is larger than the model
+input: with reduce="auto" the largest factor is picked that still leaves
+the frame at least as large as the IMGSZ letterbox needs, so the model
+sees the same detail and the decoder does 1/4 - 1/64 of the work. A
+640x480 stream at IMGSZ 384 decodes at full size; 1280x720 at /2.
+
+    grab = MjpegGrabber(STREAM_URL, imgsz=IMGSZ)   # same read()/release() as FrameGrabber
+    frame = grab.read()
+    seq, ts, frame = grab.read_latest()               # ts = arrival time of the JPEG
+    seq, ts, frame = grab.read_new(seq, timeout=1.0)  # blocks for the next one
+    grab.stats()   # {"received": ..., "decoded": ..., "skipped": ..., "scale": ...}
+"""
+import threading
+import time
+import urllib.request
+
+import cv2
+import numpy as np
+
+READ_TIMEOUT_S = 5.0
+RECONNECT_S = 1.0
+REDUCE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def auto_reduce(width, height, imgsz):
+    """Largest decode factor that keeps the frame >= its IMGSZ letterbox size"""
+    if not imgsz:
+        return 1
+    r = min(imgsz / height, imgsz / width)
+    need_w, need_h = int(width * r), int(height * r)
+    for factor in (8, 4, 2):
+        if width // factor >= need_w and height // factor >= need_h:
+            return factor
+    return 1
+
+
+def iter_jpegs(stream):
+    """JPEG payloads of a multipart MJPEG stream (file-like, binary)"""
+    while True:
+        line = stream.readline()
+        if not line:
+            return
+        if not line.startswith(b"--"):
+            continue
+        # Part headers up to the blank line
+        length = None
+        while True:
+            header = stream.readline()
+            if not header:
+                return
+            header = header.strip()
+            if not header:
+                break
+            name, _, value = header.partition(b":")
+            if name.strip().lower() == b"content-length":
+                length = int(value.strip())
+        if length is not None:
+            data = stream.read(length)
+            if len(data) < length:
+                return
+        else:
+            # No Content-Length: the JPEG ends at its EOI marker
+            chunks = []
+            while True:
+                chunk = stream.readline()
+                if not chunk:
+                    return
+                chunks.append(chunk)
+                if chunk.rstrip(b"\r\n").endswith(b"\xff\xd9"):
+                    break
+            data = b"".join(chunks).rstrip(b"\r\n")
+        if data[:2] == b"\xff\xd8":
+            yield data
+
+
+class MjpegGrabber:
+    def __init__(self, url, imgsz=None, reduce="auto", timeout=READ_TIMEOUT_S):
+        self.url = url
+        self.imgsz = imgsz
+        self.reduce = reduce
+        self.timeout = timeout
+        self.cond = threading.Condition()
+        self.jpeg = None
+        self.jpeg_seq = 0
+        self.jpeg_stamp = 0.0
+        self.frame = None
+        self.frame_seq = 0
+        self.frame_stamp = 0.0
+        self.scale = None if reduce == "auto" else int(reduce)
+        self.received = 0
+        self.decoded = 0
+        self.reconnects = 0
+
+        # Fail like FrameGrabber when the stream isn't there
+        self.resp = self._open()
+        self.running = True
+        self.th = threading.Thread(target=self._loop, daemon=True)
+        self.th.start()
+
+    def _open(self):
+        try:
+            return urllib.request.urlopen(self.url, timeout=self.timeout)
+        except OSError as e:
+            raise RuntimeError(f"Failed to open MJPEG stream {self.url}: {e}")
+
+    def _loop(self):
+        while self.running:
+            try:
+                for data in iter_jpegs(self.resp):
+                    with self.cond:
+                        self.jpeg, self.jpeg_stamp = data, time.time()
+                        self.jpeg_seq += 1
+                        self.received += 1
+                        self.cond.notify_all()
+                    if not self.running:
+                        return
+            except OSError:
+                pass
+            if not self.running:
+                return
+            # Stream ended or stalled: reconnect
+            self.resp.close()
+            time.sleep(RECONNECT_S)
+            try:
+                self.resp = self._open()
+                self.reconnects += 1
+            except RuntimeError:
+                continue
+
+    def _decode(self, data):
+        if self.scale is None:
+            # First frame: full decode tells us the stream size
+            frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+            if frame is None:
+                return None
+            self.scale = auto_reduce(frame.shape[1], frame.shape[0], self.imgsz)
+            if self.scale == 1:
+                return frame
+        return cv2.imdecode(np.frombuffer(data, np.uint8), REDUCE_FLAGS[self.scale])
+
+    def _frame_for(self, data, seq, stamp):
+        if seq != self.frame_seq:
+            frame = self._decode(data)
+            if frame is None:
+                return None
+            self.frame, self.frame_seq, self.frame_stamp = frame, seq, stamp
+            self.decoded += 1
+        return self.frame_seq, self.frame_stamp, self.frame
+
+    def read_latest(self):
+        """(seq, arrival timestamp, BGR frame) of the newest JPEG, decoded if it hasn't been yet"""
+        with self.cond:
+            data, seq, stamp = self.jpeg, self.jpeg_seq, self.jpeg_stamp
+        if data is None:
+            return None
+        return self._frame_for(data, seq, stamp)
+
+    def read_new(self, after_seq, timeout=None):
+        """Block until a JPEG newer than after_seq arrives, then decode it; None on timeout"""
+        with self.cond:
+            # jpeg_seq is 0 before the first JPEG; wait for one to exist
+            if not self.cond.wait_for(lambda: self.jpeg is not None and self.jpeg_seq > after_seq, timeout):
+                return None
+            data, seq, stamp = self.jpeg, self.jpeg_seq, self.jpeg_stamp
+        return self._frame_for(data, seq, stamp)
+
+    def read(self):
+        latest = self.read_latest()
+        return latest[2] if latest else None
+
+    def still_valid(self, seq):
+        # Every decode is a new array, never overwritten in place
+        return True
+
+    def stats(self):
+        return {"received": self.received, "decoded": self.decoded,
+                "skipped": self.received - self.decoded, "scale": self.scale,
+                "reconnects": self.reconnects}
+
+    def release(self):
+        self.running = False
+        try:
+            self.resp.close()
+        except Exception:
+            pass
+        try:
+            self.th.join(timeout=1.0)
+        except Exception:
+            pass
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Inference backends for the YOLO detectors.
+
+The detectors ship as PyTorch .pt files. Exported copies live next to them
+and are loaded through the same ultralytics YOLO(...) API, so predict() and
+the result objects don't change - only the runtime underneath does:
+
+    pt              PyTorch (the original weights)
+    onnx            ONNX Runtime, CPUExecutionProvider      <stem>.onnx
+    openvino        OpenVINO CPU plugin                     <stem>_openvino_model/
+    onnx-int8       ONNX Runtime, static INT8 (QDQ)         <stem>_int8.onnx
+    openvino-int8   OpenVINO, NNCF post-training INT8       <stem>_int8_openvino_model/
+
+FP32 exports are made with export_models.py, INT8 ones with
+quantize_models.py (they need calibration images), all at the pipeline's
+fixed IMGSZ.
+"""
+from pathlib import Path
+
+BACKENDS = ("pt", "onnx", "openvino", "onnx-int8", "openvino-int8")
+INT8_BACKENDS = ("onnx-int8", "openvino-int8")
+
+
+def static_input(backend):
+    """True if `backend` only accepts (1, 3, imgsz, imgsz) input (exports use dynamic=False)"""
+    return backend != "pt"
+
+
+def exported_path(weights, backend):
+    """Where the export of `weights` for `backend` lives"""
+    weights = Path(weights)
+    if backend == "pt":
+        return weights
+    if backend == "onnx":
+        return weights.with_suffix(".onnx")
+    if backend == "openvino":
+        return weights.with_name(f"{weights.stem}_openvino_model")
+    if backend == "onnx-int8":
+        return weights.with_name(f"{weights.stem}_int8.onnx")
+    if backend == "openvino-int8":
+        return weights.with_name(f"{weights.stem}_int8_openvino_model")
+    raise ValueError(f"Unknown backend: {backend} (use one of {', '.join(BACKENDS)})")
+
+
+def export(weights, backend, imgsz, **kwargs):
+    """Export `weights` for `backend`; returns the exported path"""
+    from ultralytics import YOLO
+    if backend == "pt":
+        return Path(weights)
+    if backend in INT8_BACKENDS:
+        raise ValueError(f"{backend} needs calibration data; use quantize_models.py")
+    model = YOLO(str(weights))
+    out = model.export(format=backend, imgsz=imgsz, dynamic=False, **kwargs)
+    return Path(out)
+
+
+def load_yolo(weights, backend="pt"):
+    """
+    Load the detector for `backend`, falling back to the .pt weights when
+    the export hasn't been made yet.
+    """
+    from ultralytics import YOLO
+    path = exported_path(weights, backend)
+    if backend != "pt" and not path.exists():
+        print(f"[models] {path} not found, using {weights} (run export_models.py)")
+        path = Path(weights)
+    return YOLO(str(path), task="detect")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Motion gate: skip detector runs while the scene isn't changing.
+
+When the car is stopped consecutive frames are nearly identical, and
+re-running the models on them only reproduces the previous detections.
+Each frame is shrunk to a small grayscale thumbnail (GATE_SIZE, INTER_AREA,
+well under a millisecond); a detector picked by the scheduler is skipped -
+its last result is reused - when the mean absolute difference between the
+thumbnail and the one from that detector's last real run is below
+`threshold` (0..255 gray levels).
+
+A reused result is never older than the detector's max reuse age, so
+safety detectors (pedestrians) still refresh at a guaranteed rate even on
+a completely static scene.
+
+    gate = MotionGate({"pedestrian": 0.5, "sign": 2.0}, threshold=MOTION_THRESHOLD)
+    names = gate.filter(frame, scheduler.select())   # drops detectors safe to reuse
+    ran = engine.run(frame, names) if names else {}
+    gate.stats()   # {"checked": ..., "skipped": {...}, "saved_pct": ...}
+"""
+import time
+
+import cv2
+import numpy as np
+
+GATE_SIZE = (64, 48)  # thumbnail (w, h) the difference is measured on
+DEFAULT_MAX_REUSE_S = 1.0
+
+
+class MotionGate:
+    def __init__(self, max_reuse_s, threshold=2.0, size=GATE_SIZE):
+        self.max_reuse_s = dict(max_reuse_s)
+        self.threshold = threshold
+        self.size = size
+        w, h = size
+        self.small = np.empty((h, w), dtype=np.uint8)
+        self.refs = {}       # detector -> thumbnail at its last real run
+        self.ref_time = {}   # detector -> time of that run
+        self.checked = {}
+        self.skipped = {}
+
+    def _thumbnail(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        cv2.resize(gray, self.size, dst=self.small, interpolation=cv2.INTER_AREA)
+        return self.small
+
+    def diff(self, name):
+        """Mean |current - reference| for a detector, after filter() computed the thumbnail"""
+        ref = self.refs.get(name)
+        if ref is None:
+            return float("inf")
+        return float(cv2.absdiff(self.small, ref).mean())
+
+    def filter(self, frame, names, now=None):
+        """The subset of `names` that has to run on this frame; records them as run"""
+        now = time.monotonic() if now is None else now
+        self._thumbnail(frame)
+        run = []
+        for name in names:
+            self.checked[name] = self.checked.get(name, 0) + 1
+            age = now - self.ref_time.get(name, float("-inf"))
+            if self.diff(name) < self.threshold and age < self.max_reuse_s.get(name, DEFAULT_MAX_REUSE_S):
+                self.skipped[name] = self.skipped.get(name, 0) + 1
+                continue
+            run.append(name)
+            if name in self.refs:
+                np.copyto(self.refs[name], self.small)
+            else:
+                self.refs[name] = self.small.copy()
+            self.ref_time[name] = now
+        return run
+
+    def forget(self, names):
+        """Drop the references of detectors whose run was discarded, so they run again"""
+        for name in names:
+            self.refs.pop(name, None)
+            self.ref_time.pop(name, None)
+
+    def stats(self):
+        checked = sum(self.checked.values())
+        skipped = sum(self.skipped.values())
+        return {
+            "checked": dict(self.checked),
+            "skipped": dict(self.skipped),
+            "saved_pct": round(100.0 * skipped / checked, 1) if checked else 0.0,
+        }
+
+    def summary(self):
+        """'saved 42% (pedestrian 10 / sign 85)' - inferences skipped so far"""
+        s = self.stats()
+        per = " / ".join(f"{name} {count}" for name, count in s["skipped"].items())
+        return f"saved {s['saved_pct']:.0f}%" + (f" ({per})" if per else "")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Per-frame post-processing time: per-box Python loop vs DetectionFilter.
+
+Feeds both the same synthetic detections (MAX_DET boxes per model over the
+LISA sign/light class names, plus a pedestrian model) and checks that they
+accept exactly the same boxes.
+
+Usage: python3 postprocess_benchmark.py [--frames 2000] [--boxes 12 100 300]
+"""
+import argparse
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from detection_filter import DetectionFilter
+
+IMGSZ = 384
+# Same rules as camera_test.py / Optimize1.py
+TH_CONF = {"light": 0.40, "sign": 0.45, "pedestrian": 0.35}
+MIN_AREA = {"light": 900, "sign": 1200, "pedestrian": 1600}
+ASPECT_LIMITS = {"light": (0.5, 3.0), "sign": (0.5, 2.5), "pedestrian": (1.3, 4.5)}
+ROI_MASK = np.zeros((IMGSZ, IMGSZ), np.uint8)
+ROI_MASK[IMGSZ // 3:, :] = 1
+
+MERGED_NAMES = dict(enumerate([
+    "go", "stop", "warning", "goLeft", "warningLeft", "stopLeft", "traffic_light_red",
+    "addedLane", "curveRight", "dip", "intersection", "laneEnds", "merge", "pedestrianCrossing",
+    "signalAhead", "slow", "stopAhead", "yield", "speedLimit25", "speedLimit35", "speedLimit45",
+    "speedLimit55", "speedLimit65", "doNotPass", "keepRight", "noLeftTurn", "noRightTurn",
+]))
+PED_NAMES = {0: "pedestrian"}
+
+
+# ---------- the per-box path being replaced (from Optimize1.py) ----------
+def box_ok(det_type, box, conf):
+    x1, y1, x2, y2 = map(int, box)
+    w, h = max(1, x2 - x1), max(1, y2 - y1)
+    area = w * h
+    if conf < TH_CONF[det_type]:
+        return False
+    if area < MIN_AREA[det_type]:
+        return False
+    ratio = h / float(w)
+    rmin, rmax = ASPECT_LIMITS[det_type]
+    if not (rmin <= ratio <= rmax):
+        return False
+    cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
+    if not (0 <= cx < ROI_MASK.shape[1] and 0 <= cy < ROI_MASK.shape[0] and ROI_MASK[cy, cx] == 1):
+        return False
+    return True
+
+
+def is_light_class(name):
+    s = name.lower()
+    if "traffic_light" in s or "tl_" in s:
+        return True
+    if "light" in s and any(col in s for col in ("red", "green", "yellow", "amber")):
+        return True
+    return s in {"red", "green", "yellow", "amber", "light_red", "light_green", "light_yellow",
+                 "trafficlight", "traffic_light"}
+
+
+def effective_type_for(name):
+    return "light" if is_light_class(name) else "sign"
+
+
+def loop_filter(names, xyxy, conf, cls, type_for):
+    groups = defaultdict(list)
+    for i in range(len(cls)):
+        cls_name = names[int(cls[i])]
+        det_type = type_for if isinstance(type_for, str) else type_for(cls_name)
+        box = xyxy[i].tolist()
+        c = float(conf[i])
+        if box_ok(det_type, box, c):
+            groups[(det_type, int(cls[i]))].append(box + [c])
+    return dict(groups)
+
+
+def synthetic(rng, frames, boxes, n_classes):
+    out = []
+    for _ in range(frames):
+        x1 = rng.uniform(0, IMGSZ - 20, boxes)
+        y1 = rng.uniform(0, IMGSZ - 20, boxes)
+        w = rng.uniform(8, 140, boxes)
+        h = w * rng.uniform(0.4, 4.0, boxes)
+        xyxy = np.stack([x1, y1, np.minimum(x1 + w, IMGSZ), np.minimum(y1 + h, IMGSZ)], 1).astype(np.float32)
+        conf = rng.uniform(0.25, 0.95, boxes).astype(np.float32)
+        cls = rng.integers(0, n_classes, boxes).astype(np.float32)
+        out.append((xyxy, conf, cls))
+    return out
+
+
+def run_case(det_filter, frames_count, boxes):
+    rng = np.random.default_rng(0)
+    models = [
+        (MERGED_NAMES, effective_type_for, synthetic(rng, frames_count, boxes, len(MERGED_NAMES))),
+        (PED_NAMES, "pedestrian", synthetic(rng, frames_count, boxes, len(PED_NAMES))),
+    ]
+    timings = {}
+    outputs = {}
+    for label, run in (
+        ("per-box loop", lambda n, d, t: loop_filter(n, *d, t)),
+        ("vectorized", lambda n, d, t: det_filter.group(*det_filter.filter_arrays(n, *d, t))),
+    ):
+        t0 = time.perf_counter()
+        outputs[label] = [run(names, data, type_for) for names, type_for, frames in models for data in frames]
+        timings[label] = (time.perf_counter() - t0) / frames_count * 1e6
+
+    same = outputs["per-box loop"] == outputs["vectorized"]
+    kept = sum(len(v) for groups in outputs["vectorized"] for v in groups.values())
+    print(f"{frames_count} frames x 2 models x {boxes} boxes, {kept} boxes kept, identical: {same}")
+    for label, us in timings.items():
+        print(f"  {label:13s} {us:8.1f} us/frame")
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--boxes", type=int, nargs="+", default=[12, 100, 300],
+                        help="detections per model per frame (MAX_DET is 12 in the pipeline)")
+    args = parser.parse_args()
+
+    det_filter = DetectionFilter(TH_CONF, MIN_AREA, ASPECT_LIMITS, ROI_MASK)
+    for boxes in args.boxes:
+        run_case(det_filter, args.frames, boxes)
+
+
+if __name__ == "__main__":
+    main()
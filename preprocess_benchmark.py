@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Per-frame preprocessing cost: letterbox() + ultralytics' own input
+preparation vs LetterboxPreprocessor.
+
+The "old" path is what a predict() call on a letterboxed uint8 frame did:
+the detector scripts' former letterbox(), then ultralytics' LetterBox (a
+border copy even when the size already matches), batch stack, BGR->RGB +
+CHW copy, float conversion and /255. It's reproduced with NumPy/OpenCV
+here so the benchmark runs without torch.
+
+Reports mean time and bytes allocated per frame (tracemalloc; NumPy and
+OpenCV outputs are allocated through NumPy, so both are counted), and the
+max difference between the two tensors.
+
+Usage: python3 preprocess_benchmark.py [--frames 500] [--width 640 --height 480] [--size 384]
+"""
+import argparse
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from frame_preprocess import LetterboxPreprocessor
+
+
+def letterbox(img, size):
+    """The letterbox() camera_test.py / Optimize1.py used before LetterboxPreprocessor"""
+    h, w = img.shape[:2]
+    r = min(size / h, size / w)
+    nh, nw = int(h * r), int(w * r)
+    resized = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    canvas = np.zeros((size, size, 3), dtype=np.uint8)
+    top = (size - nh) // 2
+    left = (size - nw) // 2
+    canvas[top:top + nh, left:left + nw] = resized
+    return canvas
+
+
+def old_path(img, size):
+    im = letterbox(img, size)
+    # ultralytics LetterBox on an already size x size image: no resize, zero border
+    im = cv2.copyMakeBorder(im, 0, 0, 0, 0, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    batch = np.stack([im])
+    batch = np.ascontiguousarray(batch[..., ::-1].transpose((0, 3, 1, 2)))
+    return batch.astype(np.float32) / 255.0
+
+
+def measure(fn, frames):
+    fn(frames[0])  # buffers / first-call setup
+    t0 = time.perf_counter()
+    for frame in frames:
+        fn(frame)
+    ms = (time.perf_counter() - t0) / len(frames) * 1000.0
+
+    tracemalloc.start()
+    allocated = 0
+    for frame in frames[:50]:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        fn(frame)
+        allocated += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return ms, allocated / min(len(frames), 50)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--size", type=int, default=384, help="IMGSZ")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8) for _ in range(8)]
+    frames = [frames[i % len(frames)] for i in range(args.frames)]
+    prep = LetterboxPreprocessor(args.size, as_tensor=False)
+
+    diff = float(np.abs(old_path(frames[0], args.size) - prep(frames[0])).max())
+    print(f"{args.frames} frames {args.width}x{args.height} -> (1, 3, {args.size}, {args.size}), "
+          f"max |diff| {diff:.2e}")
+    for label, fn in (
+        ("letterbox + ultralytics", lambda f: old_path(f, args.size)),
+        ("LetterboxPreprocessor", prep),
+    ):
+        ms, allocated = measure(fn, frames)
+        print(f"  {label:24s} {ms:6.2f} ms/frame   {allocated / 1024:8.1f} KiB allocated/frame")
+
+
+if __name__ == "__main__":
+    main()
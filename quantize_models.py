@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+INT8 post-training quantization for the detectors, with an mAP / latency report.
+
+Calibrates on images from our LISA-derived datasets: the image folder plus
+the YOLO label folder that new_folders.create_yolo_annotations() wrote.
+The two are linked into an ultralytics-style images/ + labels/ tree under
+--work as two disjoint splits: --eval images for the report and --calib
+other images for calibration, so the INT8 models aren't scored on the
+images they were calibrated on.
+
+Calibration images are replaced by exactly what the detector loop feeds
+the model: LetterboxPreprocessor's layout (pad 0, the detector's ROI crop
+from detector_rois.py padded into the square canvas the static exports
+take), saved as IMGSZ x IMGSZ PNGs. ultralytics' own letterbox (pad 114)
+is then a no-op on them, so both NNCF and ONNX Runtime see deployment's
+activation ranges. Which detector a weights file is comes from its name
+(lights / signs / both = merged / pedestrian) or --detectors.
+
+Backends (see model_backends.py):
+    openvino-int8   NNCF post-training quantization via ultralytics' OpenVINO export
+    onnx-int8       ONNX Runtime static QDQ quantization of the FP32 .onnx export
+
+Report: mAP50, mAP50-95 and CPU inference ms/image for the FP32 .pt model
+and each INT8 model, measured with ultralytics val() on the same images.
+
+Usage:
+    python3 quantize_models.py --weights /home/sarsa/Traffic_lights_detection.pt \\
+        --images ".../dayTrain/dayClip2/frames" --labels ".../Traffic_Lights_YOLO/dayTraining2"
+Then set MODEL_BACKEND = "openvino-int8" (or "onnx-int8") in camera_test.py.
+Requires: pip install ultralytics onnx onnxruntime openvino nncf
+"""
+import argparse
+import random
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from detector_rois import MERGED_DETECTORS, ROI_CROP, detector_roi
+from frame_preprocess import LetterboxPreprocessor
+from model_backends import export, exported_path, load_yolo
+
+IMGSZ = 384             # must match camera_test.py / Optimize1.py
+CALIB_IMAGES = 300      # NNCF/ORT calibration samples
+EVAL_IMAGES = 500
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png")
+
+
+# =========================
+# Dataset staging
+# =========================
+def stage_dataset(images_dir, labels_dir, work_dir, names, splits, seed=0):
+    """
+    Link disjoint sets of labelled images into work_dir/images/<split> and
+    work_dir/labels/<split>, up to `count` each for (split, count) in `splits`
+    (filled in that order), and write work_dir/<split>.yaml with that split
+    as the val set. Returns {split: (yaml, images)}.
+    """
+    images_dir, labels_dir, work_dir = Path(images_dir), Path(labels_dir), Path(work_dir)
+    pairs = []
+    for image in sorted(images_dir.rglob("*")):
+        if image.suffix.lower() not in IMAGE_SUFFIXES:
+            continue
+        label = labels_dir / image.relative_to(images_dir).with_suffix(".txt")
+        if label.exists():
+            pairs.append((image, label))
+    if not pairs:
+        raise SystemExit(f"No images in {images_dir} have labels in {labels_dir}")
+    random.Random(seed).shuffle(pairs)
+
+    result = {}
+    start = 0
+    for split, count in splits:
+        chunk = pairs[start:start + count]
+        start += len(chunk)
+        if not chunk:
+            raise SystemExit(f"Not enough labelled images in {images_dir} for the {split} split")
+        img_out = work_dir / "images" / split
+        lbl_out = work_dir / "labels" / split
+        for folder in (img_out, lbl_out):
+            folder.mkdir(parents=True, exist_ok=True)
+            for old in folder.iterdir():
+                old.unlink()
+        staged = []
+        for i, (image, label) in enumerate(chunk):
+            # Flatten clip sub-folders; prefix keeps names unique
+            stem = f"{i:05d}_{image.stem}"
+            (img_out / f"{stem}{image.suffix}").symlink_to(image.resolve())
+            (lbl_out / f"{stem}.txt").symlink_to(label.resolve())
+            staged.append(img_out / f"{stem}{image.suffix}")
+
+        yaml_path = work_dir / f"{split}.yaml"
+        lines = [f"path: {work_dir.resolve()}", f"train: images/{split}", f"val: images/{split}", "names:"]
+        lines += [f"  {idx}: {name}" for idx, name in sorted(names.items())]
+        yaml_path.write_text("\n".join(lines) + "\n")
+        result[split] = (yaml_path, staged)
+    return result
+
+
+def detector_for(weights):
+    """detector_rois name of a weights file, from its file name"""
+    stem = Path(weights).stem.lower()
+    light, sign = "light" in stem, "sign" in stem
+    if light and sign:
+        return "merged"
+    if light:
+        return "light"
+    if sign:
+        return "sign"
+    if "pedestrian" in stem:
+        return "pedestrian"
+    raise SystemExit(f"Can't tell which detector {weights} is; pass --detectors")
+
+
+def stage_calibration(images, imgsz, roi):
+    """
+    Overwrite the staged calibration images (links) with the model input the
+    runtime builds from them, as imgsz x imgsz BGR PNGs. Returns the new paths.
+    The labels stay as they are; calibration doesn't read them.
+    """
+    prep = LetterboxPreprocessor(imgsz, as_tensor=False, roi=roi, square=True)
+    staged = []
+    for path in images:
+        tensor = prep(cv2.imread(str(path)))
+        # RGB 0..1 CHW back to BGR uint8 HWC; exact, the tensor came from uint8
+        bgr = np.rint(tensor[0, ::-1].transpose(1, 2, 0) * 255.0).astype(np.uint8)
+        path.unlink()
+        png = path.with_suffix(".png")
+        cv2.imwrite(str(png), bgr)
+        staged.append(png)
+    return staged
+
+
+# =========================
+# Quantizers
+# =========================
+def calibration_tensor(path, size):
+    """Model input for a stage_calibration() image (already size x size: no resize, no padding)"""
+    return LetterboxPreprocessor(size, as_tensor=False)(cv2.imread(str(path))).copy()
+
+
+def quantize_openvino(weights, calib_yaml, imgsz):
+    from ultralytics import YOLO
+    model = YOLO(str(weights))
+    # ultralytics runs NNCF over the dataset's val split - the calib split here,
+    # already in the runtime layout (see stage_calibration)
+    model.export(format="openvino", int8=True, data=str(calib_yaml), imgsz=imgsz,
+                 dynamic=False, fraction=1.0)
+    return exported_path(weights, "openvino-int8")
+
+
+def quantize_onnx(weights, calib_images, imgsz):
+    import onnx
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                          quantize_static)
+
+    fp32 = exported_path(weights, "onnx")
+    if not fp32.exists():
+        export(weights, "onnx", imgsz)
+    out = exported_path(weights, "onnx-int8")
+    input_name = onnx.load(str(fp32), load_external_data=False).graph.input[0].name
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self.images = iter(calib_images)
+
+        def get_next(self):
+            image = next(self.images, None)
+            return None if image is None else {input_name: calibration_tensor(image, imgsz)}
+
+    quantize_static(str(fp32), str(out), Reader(), quant_format=QuantFormat.QDQ,
+                    per_channel=True, activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+
+    # Keep the export metadata (class names, imgsz, stride) ultralytics reads back
+    src, dst = onnx.load(str(fp32)), onnx.load(str(out))
+    del dst.metadata_props[:]
+    dst.metadata_props.extend(src.metadata_props)
+    onnx.save(dst, str(out))
+    return out
+
+
+# =========================
+# Report
+# =========================
+def evaluate(weights, backend, data_yaml, imgsz):
+    metrics = load_yolo(weights, backend).val(data=str(data_yaml), imgsz=imgsz, batch=1,
+                                              device="cpu", plots=False, verbose=False)
+    return metrics.box.map50, metrics.box.map, metrics.speed["inference"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--weights", nargs="+", required=True)
+    parser.add_argument("--detectors", nargs="+", choices=sorted(ROI_CROP) + sorted(MERGED_DETECTORS),
+                        help="detector per --weights, for its ROI crop (default: from the file names)")
+    parser.add_argument("--images", required=True, help="image folder of the LISA-derived dataset")
+    parser.add_argument("--labels", required=True, help="YOLO label folder from create_yolo_annotations()")
+    parser.add_argument("--backends", nargs="+", default=["openvino-int8", "onnx-int8"],
+                        choices=["openvino-int8", "onnx-int8"])
+    parser.add_argument("--calib", type=int, default=CALIB_IMAGES, help="calibration images")
+    parser.add_argument("--eval", type=int, default=EVAL_IMAGES, help="evaluation images")
+    parser.add_argument("--work", default="quant_work", help="staging folder for the dataset links")
+    parser.add_argument("--no-quantize", action="store_true", help="only report on existing INT8 models")
+    args = parser.parse_args()
+
+    if args.detectors and len(args.detectors) != len(args.weights):
+        parser.error("--detectors needs one entry per --weights")
+    detectors = args.detectors or [detector_for(weights) for weights in args.weights]
+
+    rows = []
+    for weights, detector in zip(args.weights, detectors):
+        names = load_yolo(weights, "pt").names
+        work = Path(args.work) / Path(weights).stem
+        # Evaluation images first, so a small dataset shortchanges calibration rather than the report
+        splits = stage_dataset(args.images, args.labels, work, names,
+                               [("val", args.eval), ("calib", args.calib)])
+        data_yaml, _ = splits["val"]
+        calib_yaml, calib_images = splits["calib"]
+        calib_images = stage_calibration(calib_images, IMGSZ, detector_roi(detector))
+        print(f"[quant] {Path(weights).name}: {len(splits['val'][1])} evaluation + "
+              f"{len(calib_images)} calibration images staged in {work}")
+
+        rows.append((Path(weights).name, "pt (fp32)") + evaluate(weights, "pt", data_yaml, IMGSZ))
+        for backend in args.backends:
+            if not args.no_quantize:
+                if backend == "openvino-int8":
+                    quantize_openvino(weights, calib_yaml, IMGSZ)
+                else:
+                    quantize_onnx(weights, calib_images, IMGSZ)
+            if not exported_path(weights, backend).exists():
+                rows.append((Path(weights).name, backend, float("nan"), float("nan"), float("nan")))
+                continue
+            rows.append((Path(weights).name, backend) + evaluate(weights, backend, data_yaml, IMGSZ))
+
+    print(f"\n{'model':34s} {'backend':14s} {'mAP50':>7s} {'mAP50-95':>9s} {'ms/img':>7s}")
+    for name, backend, map50, map5095, ms in rows:
+        print(f"{name:34s} {backend:14s} {map50:7.3f} {map5095:9.3f} {ms:7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Production launcher for the dashboard backend.
+
+Runs the same Flask-SocketIO app as `python3 app.py`, but on an eventlet or
+gevent server with debug and the reloader off, so WebSockets are served
+natively instead of through werkzeug's threaded dev server.
+
+Settings (environment variables):
+    ASYNC_MODE       eventlet (default) or gevent
+    HOST, PORT       bind address (default 0.0.0.0:8080)
+    WORKER_POOL      max concurrent green threads/connections (default 1000)
+    ACCESS_LOG       1 to log every HTTP request (default off)
+
+The dashboard state lives in-process, so this is always a single process;
+scale with green threads, not with extra worker processes.
+
+Requires: pip install eventlet (or gevent for ASYNC_MODE=gevent), in the
+backend's venv. adas_integration_run.sh falls back to `python3 app.py`
+when neither is installed.
+"""
+import os
+
+ASYNC_MODE = os.environ.get("ASYNC_MODE", "eventlet")
+
+# Monkey patching has to happen before anything imports threading/socket
+try:
+    if ASYNC_MODE == "eventlet":
+        import eventlet
+        eventlet.monkey_patch()
+    elif ASYNC_MODE == "gevent":
+        from gevent import monkey
+        monkey.patch_all()
+    else:
+        raise SystemExit(f"Unsupported ASYNC_MODE: {ASYNC_MODE} (use eventlet or gevent)")
+except ImportError:
+    raise SystemExit(f"ASYNC_MODE={ASYNC_MODE} needs: pip install {ASYNC_MODE} (or run python3 app.py)")
+
+# Read by app.py when it creates the SocketIO server
+os.environ["SOCKETIO_ASYNC_MODE"] = ASYNC_MODE
+
+HOST = os.environ.get("HOST", "0.0.0.0")
+PORT = int(os.environ.get("PORT", "8080"))
+WORKER_POOL = int(os.environ.get("WORKER_POOL", "1000"))
+ACCESS_LOG = os.environ.get("ACCESS_LOG", "0") == "1"
+
+from app import app, socketio, log  # noqa: E402  (after monkey patching)
+
+
+def server_options():
+    """Worker settings in the form each server's run() expects"""
+    if ASYNC_MODE == "eventlet":
+        # Passed through to eventlet.wsgi.server
+        return {"max_size": WORKER_POOL}
+    # Passed through to gevent.pywsgi.WSGIServer
+    from gevent.pool import Pool
+    return {"spawn": Pool(WORKER_POOL)}
+
+
+def main():
+    log.info("Starting production server", extra={"fields": {
+        "async_mode": ASYNC_MODE, "host": HOST, "port": PORT, "worker_pool": WORKER_POOL}})
+    socketio.run(
+        app,
+        host=HOST,
+        port=PORT,
+        debug=False,
+        use_reloader=False,
+        log_output=ACCESS_LOG,
+        **server_options()
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Socket.IO load test for the dashboard backend.
+
+Connects N dashboard clients, then posts speed updates at a fixed rate and
+measures, per client, the time from the POST to the matching state_patch.
+Reports how many clients connected and p50/p99/max emit latency.
+
+Usage: python3 socketio_load_test.py [--clients 200] [--rate 20] [--seconds 10]
+Requires: pip install "python-socketio[client]" requests
+"""
+import argparse
+import threading
+import time
+
+import requests
+import socketio
+
+BASE_URL = "http://localhost:8080"
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=BASE_URL)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=20.0, help="speed updates per second")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    sent_at = {}          # speed value -> time the POST was sent
+    latencies = []
+    lock = threading.Lock()
+
+    def on_patch(patch):
+        received = time.perf_counter()
+        speed = patch.get("changes", {}).get("speed")
+        with lock:
+            t0 = sent_at.get(speed)
+            if t0 is not None:
+                latencies.append((received - t0) * 1000.0)
+
+    # ---- connect clients ----
+    clients = []
+    failed = 0
+    t_connect = time.perf_counter()
+    for _ in range(args.clients):
+        client = socketio.Client(reconnection=False)
+        client.on("state_patch", on_patch)
+        try:
+            client.connect(args.url, transports=["websocket"], wait_timeout=5)
+            clients.append(client)
+        except Exception:
+            failed += 1
+    connect_s = time.perf_counter() - t_connect
+    print(f"Connected {len(clients)}/{args.clients} clients in {connect_s:.1f}s ({failed} failed)")
+
+    # ---- drive updates ----
+    session = requests.Session()
+    interval = 1.0 / args.rate
+    # Unique speed values so each patch maps back to exactly one POST
+    speed = 1000
+    posted = 0
+    end = time.perf_counter() + args.seconds
+    while time.perf_counter() < end:
+        tick = time.perf_counter()
+        speed += 1
+        with lock:
+            sent_at[speed] = time.perf_counter()
+        try:
+            session.post(f"{args.url}/update_speed", json={"speed": speed}, timeout=2)
+            posted += 1
+        except requests.RequestException:
+            pass
+        delay = interval - (time.perf_counter() - tick)
+        if delay > 0:
+            time.sleep(delay)
+
+    time.sleep(1.0)  # let the last patches arrive
+
+    for client in clients:
+        try:
+            client.disconnect()
+        except Exception:
+            pass
+
+    with lock:
+        samples = list(latencies)
+    expected = posted * len(clients)
+    print(f"Posted {posted} speed updates at {args.rate:.0f}/s")
+    print(f"Received {len(samples)} patches across clients "
+          f"({expected - len(samples)} coalesced or missed)")
+    print(f"Emit latency ms: p50={percentile(samples, 50):.1f} "
+          f"p99={percentile(samples, 99):.1f} max={max(samples, default=float('nan')):.1f}")
+
+    try:
+        print("Server broadcast stats:", session.get(f"{args.url}/broadcast_stats", timeout=2).json())
+    except requests.RequestException:
+        pass
+
+
+if __name__ == "__main__":
+    main()
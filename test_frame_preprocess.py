@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+ROI-cropped preprocessing against a static-shape backend.
+
+ONNX / OpenVINO / INT8 exports are made with dynamic=False, so they only
+take (1, 3, IMGSZ, IMGSZ). A stand-in ONNX model with that fixed input is
+run in ONNX Runtime on the tensor LetterboxPreprocessor builds for a
+cropped ROI.
+
+Run: python3 -m pytest -q test_frame_preprocess.py
+Requires: pip install pytest onnx onnxruntime
+"""
+import numpy as np
+import pytest
+
+from frame_preprocess import LetterboxPreprocessor
+
+onnx = pytest.importorskip("onnx")
+ort = pytest.importorskip("onnxruntime")
+
+IMGSZ = 384
+ROI = (0.0, 0.25, 1.0, 0.7)  # a traffic-light style crop: a band across the frame
+
+
+def static_session(size):
+    """ONNX Runtime session for a model fixed at (1, 3, size, size) input"""
+    from onnx import TensorProto, helper
+    graph = helper.make_graph(
+        [helper.make_node("ReduceMax", ["images"], ["output0"], keepdims=0)],
+        "static_input",
+        [helper.make_tensor_value_info("images", TensorProto.FLOAT, [1, 3, size, size])],
+        [helper.make_tensor_value_info("output0", TensorProto.FLOAT, [])],
+    )
+    # IR version pinned so older ONNX Runtime builds load it too
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)], ir_version=8)
+    return ort.InferenceSession(model.SerializeToString(), providers=["CPUExecutionProvider"])
+
+
+def frame_with_box(x0, y0, x1, y1, h=480, w=640):
+    frame = np.zeros((h, w, 3), dtype=np.uint8)
+    frame[y0:y1, x0:x1] = 255
+    return frame
+
+
+def white_box(tensor):
+    """(x0, y0, x1, y1) of the white pixels in a (1, 3, H, W) tensor"""
+    ys, xs = np.nonzero(tensor[0, 0] > 0.5)
+    return np.array([xs.min(), ys.min(), xs.max() + 1, ys.max() + 1], dtype=np.float32)
+
+
+class FakeBoxes:
+    def __init__(self, xyxy):
+        self.data = np.array([list(xyxy) + [0.9, 0.0]], dtype=np.float32)
+
+    def __len__(self):
+        return len(self.data)
+
+
+class FakeResult:
+    def __init__(self, xyxy):
+        self.boxes = FakeBoxes(xyxy)
+
+
+def test_square_roi_tensor_runs_on_static_model():
+    session = static_session(IMGSZ)
+    prep = LetterboxPreprocessor(IMGSZ, as_tensor=False, roi=ROI, square=True)
+    tensor = prep(frame_with_box(300, 200, 340, 260))
+    assert tensor.shape == (1, 3, IMGSZ, IMGSZ)
+    (out,) = session.run(None, {"images": tensor})
+    assert out == pytest.approx(1.0)
+
+
+def test_stride_rounded_roi_tensor_is_rejected_by_static_model():
+    # What the square option is for: the smaller canvas doesn't fit
+    session = static_session(IMGSZ)
+    prep = LetterboxPreprocessor(IMGSZ, as_tensor=False, roi=ROI)
+    tensor = prep(frame_with_box(300, 200, 340, 260))
+    assert tensor.shape[2] < IMGSZ
+    with pytest.raises(Exception):
+        session.run(None, {"images": tensor})
+
+
+@pytest.mark.parametrize("square", [False, True])
+def test_restore_maps_roi_boxes_to_full_frame_letterbox(square):
+    frame = frame_with_box(300, 200, 340, 260)
+    full = white_box(LetterboxPreprocessor(IMGSZ, as_tensor=False)(frame))
+    prep = LetterboxPreprocessor(IMGSZ, as_tensor=False, roi=ROI, square=square)
+    result = prep.restore(FakeResult(white_box(prep(frame))))
+    np.testing.assert_allclose(result.boxes.data[0, :4], full, atol=1.0)
@@ -48,18 +48,11 @@ def realistic_acceleration(start_speed, end_speed, rate=30, time_step=0.05):
 
 def update_speed_limit(new_limit):
     """Update speed limit sign."""
-    state = requests.get(f"{BASE_URL}/get_state").json()
-    for sign in state['signs']:
-        if sign['type'] == 'speed_limit':
-            requests.post(f"{BASE_URL}/update_sign", json={
-                "id": sign['id'],
-                "type": "speed_limit",
-                "value": str(new_limit),
-                "distance": "50m"
-            })
-            print(f"🔄 Speed limit set to {new_limit} MPH")
-            return True
-    print("⚠️ Could not find speed limit sign")
+    response = requests.post(f"{BASE_URL}/speed_limit", json={"value": new_limit, "distance": "50m"})
+    if response.status_code == 200:
+        print(f"🔄 Speed limit set to {new_limit} MPH")
+        return True
+    print(f"⚠️ Could not set speed limit ({response.status_code}): {response.text}")
     return False
 
 def clear_database():